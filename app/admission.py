@@ -0,0 +1,169 @@
+"""Admission control: shed excess load before it reaches the database.
+
+The ``admit`` dependency, installed on the whole app, checks every request
+before its route opens a database session, against:
+
+- a token bucket per route listed in ``ROUTE_RATE_LIMITS``, which caps the
+  rate of the whole endpoint;
+- a token bucket per author for writes carrying ``author_id``, so one client
+  cannot monopolise the single SQLite writer;
+- a cap on concurrent ``EXPENSIVE_READS``, so large pages, searches and
+  exports cannot take every threadpool worker and connection.
+
+Requests over a rate get 429, over the concurrency cap 503, both with
+``Retry-After`` and without touching the database. Everything is in-process:
+with several workers each one enforces its own limits.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from typing import Dict, Hashable, Optional, Tuple
+from . import config
+
+# "METHOD path template" of the reads limited by EXPENSIVE_READ_CONCURRENCY.
+EXPENSIVE_READS = frozenset({
+    "GET /discussions/",
+    "GET /comments/discussion/{discussion_id}",
+    "GET /comments/discussion/{discussion_id}/tree",
+    "GET /search/",
+    "GET /changes/",
+    "GET /export",
+    "GET /discussions/{discussion_id}/export",
+    "GET /users/{user_id}/discussions",
+    "GET /users/{user_id}/comments",
+})
+
+
+class TokenBuckets:
+    """One token bucket per key: ``burst`` tokens, refilled at ``rate`` per second.
+
+    A bucket left alone for ``burst / rate`` seconds is full again, the same
+    as a new one, so it is dropped. Buckets are kept in last-use order and
+    expired ones are popped from the front, which makes memory proportional
+    to the keys active in that window. ``max_keys`` bounds it under a flood
+    of distinct keys by dropping the least recently used.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int, name: str = "token bucket"):
+        if not rate > 0 or not burst >= 1:
+            raise ValueError(f"{name}: the rate must be above 0 and the burst at least 1, got {rate}:{burst}")
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle = burst / rate
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def take(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Take a token from ``key``'s bucket; returns 0, or the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._buckets:
+                oldest, (_, updated) = next(iter(self._buckets.items()))
+                if now - updated < self.idle:
+                    break
+                del self._buckets[oldest]
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+                self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimit:
+    """Counts requests in flight; ``try_acquire`` fails instead of queueing past ``limit``."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self.limit:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+
+def parse_route_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """``"POST /discussions/=5:20,GET /search/=50:100"`` -> {route: (rate, burst)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, value = item.rpartition("=")
+        rate, _, burst = value.partition(":")
+        limits[route.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+author_buckets = TokenBuckets(
+    config.AUTHOR_WRITE_RATE, config.AUTHOR_WRITE_BURST, config.ADMISSION_MAX_KEYS, "AUTHOR_WRITE_RATE:AUTHOR_WRITE_BURST"
+)
+route_buckets = {
+    route: TokenBuckets(rate, burst, 1, f"ROUTE_RATE_LIMITS {route}")
+    for route, (rate, burst) in parse_route_limits(config.ROUTE_RATE_LIMITS).items()
+}
+expensive_reads = ConcurrencyLimit(config.EXPENSIVE_READ_CONCURRENCY)
+
+
+def stats() -> dict:
+    return {
+        "author_keys": len(author_buckets),
+        "author_rejected": author_buckets.rejected,
+        "route_rejected": sum(buckets.rejected for buckets in route_buckets.values()),
+        "expensive_active": expensive_reads.active,
+        "expensive_rejected": expensive_reads.rejected,
+    }
+
+
+async def admit(request: Request):
+    """App-wide dependency applying the limits above when ``ADMISSION_CONTROL`` is on.
+
+    It runs once the request is routed and before any route dependency opens
+    a session. The concurrency slot is held until the response, streamed
+    bodies included, has been sent.
+    """
+    if not config.ADMISSION_CONTROL:
+        yield
+        return
+    key = f"{request.method} {request.scope['route'].path}"
+    buckets = route_buckets.get(key)
+    wait = buckets.take(None) if buckets is not None else 0.0
+    author = request.query_params.get("author_id")
+    if not wait and author is not None and request.method != "GET":
+        wait = author_buckets.take(author)
+    if wait:
+        raise _reject(429, "Too many requests", wait)
+
+    if key not in EXPENSIVE_READS:
+        yield
+        return
+    if not expensive_reads.try_acquire():
+        raise _reject(503, "Server busy", config.ADMISSION_RETRY_AFTER)
+    try:
+        yield
+    finally:
+        expensive_reads.release()
+
+
+def _reject(status: int, detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=status, detail=detail, headers={"Retry-After": str(max(math.ceil(retry_after), 1))})
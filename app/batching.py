@@ -0,0 +1,84 @@
+"""Group commit: coalesce concurrent writes into one transaction.
+
+The first request to arrive opens a batch and becomes its leader. It waits up
+to ``window`` seconds, or until ``max_items`` requests have joined, then
+writes the whole batch with ``flush(session, items)`` in a single transaction,
+on a session of its own: a request-scoped one would be closed under it if
+the leader disconnects. Every request gets back its own result, or its own
+error, once that transaction has committed. SQLite then pays for one commit,
+and one fsync, per batch instead of one per request.
+"""
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, List, Optional
+from . import database
+
+
+class _Batch:
+    def __init__(self):
+        self.items: list = []
+        self.futures: List[asyncio.Future] = []
+        self.full = asyncio.Event()
+
+
+class GroupCommit:
+    """Batches calls to ``flush``, which returns one result or exception per item, in order."""
+
+    def __init__(self, flush: Callable[..., list], max_items: int, window: float, sessions: Callable[[], database.AnySession]):
+        self.flush = flush
+        self.sessions = sessions
+        self.max_items = max_items
+        self.window = window
+        self._open: Optional[_Batch] = None
+        self.batches = self.items = 0
+
+    async def submit(self, item):
+        batch = self._open
+        leader = batch is None
+        if leader:
+            batch = self._open = _Batch()
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_items:
+            self._close(batch)
+
+        if leader:
+            # Shielded so a disconnecting leader does not strand its followers.
+            await asyncio.shield(asyncio.ensure_future(self._lead(batch)))
+        return await future
+
+    def _close(self, batch: _Batch) -> None:
+        if self._open is batch:
+            self._open = None
+        batch.full.set()
+
+    async def _lead(self, batch: _Batch) -> None:
+        try:
+            await asyncio.wait_for(batch.full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        self._close(batch)
+        self.batches += 1
+        self.items += len(batch.items)
+        try:
+            results = await self._flush(batch.items)
+        except Exception as exc:
+            results = [exc] * len(batch.items)
+        for future, result in zip(batch.futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _flush(self, items: list) -> list:
+        db = self.sessions()
+        try:
+            return await database.run(db, self.flush, items)
+        finally:
+            if isinstance(db, AsyncSession):
+                await db.close()
+            else:
+                db.close()
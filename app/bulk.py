@@ -0,0 +1,208 @@
+"""Batch inserts for migrating content from other forums.
+
+Every chunk of ``chunk_size`` items is validated with one query per kind of
+reference (authors, discussions, parents, explicit ids), inserted with a
+single executemany and committed on its own. Invalid items are reported with
+their index and skipped; the rest of the chunk still goes in.
+"""
+from collections import defaultdict
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Integer, bindparam, case, insert, select, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+from . import cache, config, models, ranking, schemas, usernames
+
+
+def check_size(items: Sequence) -> None:
+    if len(items) > config.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {config.BULK_MAX_ITEMS} items per request")
+
+
+def _existing(db: Session, column, values: Iterable) -> Set:
+    values = {v for v in values if v is not None}
+    if not values:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(values))))
+
+
+def _insert(db: Session, model, rows: List[dict]) -> List[int]:
+    """executemany ``rows`` into ``model``'s table and return the ids in row order.
+
+    Rows with an explicit id and rows taking the next autoincrement value
+    need different column lists, so each group is one executemany.
+    """
+    ids: List[Optional[int]] = [None] * len(rows)
+    for explicit in (True, False):
+        positions = [i for i, row in enumerate(rows) if ("id" in row) == explicit]
+        if not positions:
+            continue
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        for position, id in zip(positions, db.scalars(stmt, [rows[i] for i in positions])):
+            ids[position] = id
+    return ids
+
+
+def _row(item, **values) -> dict:
+    row = item.dict()
+    if row.get("id") is None:
+        row.pop("id", None)
+    row.update(values)
+    return row
+
+
+def _chunks(items: Sequence, chunk_size: int):
+    for offset in range(0, len(items), chunk_size):
+        yield offset, items[offset:offset + chunk_size]
+
+
+def _result() -> dict:
+    return {"created": 0, "ids": [], "errors": []}
+
+
+def _record(result: dict, offset: int, ids: List[Optional[int]], errors: Dict[int, str]) -> None:
+    result["ids"].extend(ids)
+    result["created"] += sum(id is not None for id in ids)
+    result["errors"].extend({"index": offset + i, "detail": detail} for i, detail in sorted(errors.items()))
+
+
+def import_users(db: Session, items: Sequence[schemas.UserImport], chunk_size: int) -> dict:
+    result = _result()
+    for offset, chunk in _chunks(items, chunk_size):
+        taken = _existing(db, models.User.username, (u.username for u in chunk))
+        used_ids = _existing(db, models.User.id, (u.id for u in chunk))
+        errors: Dict[int, str] = {}
+        rows, accepted = [], []
+        for i, item in enumerate(chunk):
+            if item.username in taken:
+                errors[i] = "Username already taken"
+            elif item.id in used_ids:
+                errors[i] = "Id already exists"
+            else:
+                taken.add(item.username)
+                if item.id is not None:
+                    used_ids.add(item.id)
+                rows.append(_row(item))
+                accepted.append(i)
+
+        ids: List[Optional[int]] = [None] * len(chunk)
+        for i, id in zip(accepted, _insert(db, models.User, rows)):
+            ids[i] = id
+        db.commit()
+        for i, row in zip(accepted, rows):
+            usernames.remember(ids[i], row["username"])
+        _record(result, offset, ids, errors)
+    return result
+
+
+def import_discussions(db: Session, items: Sequence[schemas.DiscussionImport], chunk_size: int) -> dict:
+    result = _result()
+    now = datetime.utcnow()
+    for offset, chunk in _chunks(items, chunk_size):
+        authors = set(usernames.lookup(db, (d.author_id for d in chunk)))
+        used_ids = _existing(db, models.Discussion.id, (d.id for d in chunk))
+        errors: Dict[int, str] = {}
+        rows, accepted = [], []
+        for i, item in enumerate(chunk):
+            if item.author_id not in authors:
+                errors[i] = "Author not found"
+            elif item.id in used_ids:
+                errors[i] = "Id already exists"
+            else:
+                if item.id is not None:
+                    used_ids.add(item.id)
+                created_at = item.created_at or now
+                rows.append(_row(
+                    item,
+                    created_at=created_at,
+                    last_activity_at=created_at,
+                    hot_score=ranking.hot_score(0, created_at, now),
+                ))
+                accepted.append(i)
+
+        ids: List[Optional[int]] = [None] * len(chunk)
+        for i, id in zip(accepted, _insert(db, models.Discussion, rows)):
+            ids[i] = id
+        db.commit()
+        _record(result, offset, ids, errors)
+    cache.responses.invalidate(cache.LISTING_HEAD)
+    return result
+
+
+def import_comments(db: Session, items: Sequence[schemas.CommentImport], chunk_size: int) -> dict:
+    result = _result()
+    now = datetime.utcnow()
+    Discussion = models.Discussion
+    for offset, chunk in _chunks(items, chunk_size):
+        authors = set(usernames.lookup(db, (c.author_id for c in chunk)))
+        used_ids = _existing(db, models.Comment.id, (c.id for c in chunk))
+        discussions = {
+            d.id: d for d in db.execute(
+                select(Discussion.id, Discussion.created_at, Discussion.comment_count)
+                .where(Discussion.id.in_({c.discussion_id for c in chunk}))
+            )
+        }
+        parent_ids = {c.parent_id for c in chunk if c.parent_id is not None}
+        # Parent id -> discussion id, for parents already stored or earlier in the chunk.
+        parents = dict(db.execute(
+            select(models.Comment.id, models.Comment.discussion_id).where(models.Comment.id.in_(parent_ids))
+        ).all()) if parent_ids else {}
+
+        errors: Dict[int, str] = {}
+        rows, accepted = [], []
+        added = defaultdict(int)
+        last_activity: Dict[int, datetime] = {}
+        for i, item in enumerate(chunk):
+            if item.author_id not in authors:
+                errors[i] = "Author not found"
+            elif item.discussion_id not in discussions:
+                errors[i] = "Discussion not found"
+            elif item.id in used_ids:
+                errors[i] = "Id already exists"
+            elif item.parent_id is not None and parents.get(item.parent_id) != item.discussion_id:
+                errors[i] = "Parent comment not found in discussion"
+            else:
+                if item.id is not None:
+                    used_ids.add(item.id)
+                    parents[item.id] = item.discussion_id
+                created_at = item.created_at or now
+                rows.append(_row(item, created_at=created_at))
+                accepted.append(i)
+                added[item.discussion_id] += 1
+                last_activity[item.discussion_id] = max(created_at, last_activity.get(item.discussion_id, created_at))
+
+        ids: List[Optional[int]] = [None] * len(chunk)
+        for i, id in zip(accepted, _insert(db, models.Comment, rows)):
+            ids[i] = id
+        if added:
+            # Same bookkeeping as create_comment, one executemany for the chunk.
+            # Counters and versions are incremented in SQL, so writers in other
+            # processes cannot be lost between the read above and this update.
+            last = bindparam("last", type_=DateTime)
+            table = Discussion.__table__
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("discussion_id"))
+                .values(
+                    comment_count=table.c.comment_count + bindparam("added", type_=Integer),
+                    last_activity_at=case((table.c.last_activity_at > last, table.c.last_activity_at), else_=last),
+                    hot_score=bindparam("hot_score"),
+                    version=table.c.version + 1,
+                ),
+                [
+                    {
+                        "discussion_id": discussion_id,
+                        "added": count,
+                        "last": last_activity[discussion_id],
+                        "hot_score": ranking.hot_score(
+                            discussions[discussion_id].comment_count + count, discussions[discussion_id].created_at, now
+                        ),
+                    }
+                    for discussion_id, count in added.items()
+                ],
+            )
+        db.commit()
+        _record(result, offset, ids, errors)
+        for discussion_id in added:
+            cache.responses.invalidate(cache.thread_tag(discussion_id), cache.discussion_tag(discussion_id))
+    return result
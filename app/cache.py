@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from . import config, fastjson
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Entries are labelled with tags (``"thread:3"``, ``"discussion:7"``...) so a
+    write can drop exactly the entries it affects. ``generation()`` is taken
+    before a value is computed; ``set()`` discards the value if anything was
+    invalidated meanwhile, so a slow read cannot re-cache stale data.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, object, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, key: Hashable, value: object, tags: Iterable[str] = (), generation: Optional[int] = None) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._discard(key)
+                        self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _discard(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+# Rendered JSON bodies of listing and thread pages.
+responses = LRUCache(config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL)
+
+# The first page of the discussion listing, the only one a new discussion lands on.
+LISTING_HEAD = "discussions:head"
+
+
+def thread_tag(discussion_id: int) -> str:
+    """Tag of the comment pages and trees of one discussion."""
+    return f"thread:{discussion_id}"
+
+
+def discussion_tag(discussion_id: int) -> str:
+    """Tag of every listing page that contains the discussion."""
+    return f"discussion:{discussion_id}"
+
+
+def render(model, data) -> bytes:
+    """Encode a page: as is on the fast path, where ``data`` is already plain, else via ``encode``."""
+    if fastjson.enabled():
+        return fastjson.dumps(data)
+    return encode(model, data)
+
+
+def encode(model, data) -> bytes:
+    """Validate ``data`` against ``model`` and encode it the way FastAPI would."""
+    if hasattr(model, "model_validate"):
+        # pydantic 2 only reads ORM attributes of nested models when asked to
+        obj = model.model_validate(data, from_attributes=True)
+    else:
+        obj = model.parse_obj(data)
+    return JSONResponse(jsonable_encoder(obj)).body
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+async def cached(key: Hashable, model, compute: Callable[[], Awaitable], tags: Callable[[dict], Iterable[str]]) -> Response:
+    """Serve ``key`` from the response cache, rendering ``await compute()`` on a miss.
+
+    ``tags`` maps the computed data to the tags the entry is invalidated by.
+    """
+    if not config.RESPONSE_CACHE:
+        return json_response(render(model, await compute()))
+    body = responses.get(key)
+    if body is None:
+        generation = responses.generation()
+        data = await compute()
+        body = render(model, data)
+        responses.set(key, body, tags(data), generation)
+    return json_response(body)
@@ -0,0 +1,91 @@
+"""Change feed for incremental sync.
+
+The ``changes`` table holds one entry per discussion or comment: the latest
+change to it. SQLite triggers replace the entry on every insert, visible
+edit, soft delete or hard delete, whether it comes from the routes, a bulk
+import or a maintenance job. ``INSERT OR REPLACE`` gives the new entry the
+next AUTOINCREMENT id, so ids order changes by commit (SQLite has a single
+writer) and the table never grows past the number of rows it tracks.
+
+A client keeps the ``next_cursor`` of its last page and asks for what
+changed since, so sync traffic follows the number of changed rows rather
+than the size of the threads.
+"""
+from fastapi import HTTPException
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+from . import models
+
+
+def _log(entity: str, row: str, discussion_id: str) -> str:
+    return (
+        f"INSERT OR REPLACE INTO changes(entity, entity_id, discussion_id) "
+        f"VALUES ('{entity}', {row}.id, {discussion_id});"
+    )
+
+
+DISCUSSIONS_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS discussions_changes_insert AFTER INSERT ON discussions
+    BEGIN {_log('discussion', 'new', 'new.id')} END""",
+    # hot_score is left out: every periodic re-decay would log the whole front page.
+    f"""CREATE TRIGGER IF NOT EXISTS discussions_changes_update
+    AFTER UPDATE OF title, body, deleted, deleted_at, version, comment_count, last_activity_at ON discussions
+    BEGIN {_log('discussion', 'new', 'new.id')} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS discussions_changes_delete AFTER DELETE ON discussions
+    BEGIN {_log('discussion', 'old', 'old.id')} END""",
+]
+
+COMMENTS_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS comments_changes_insert AFTER INSERT ON comments
+    BEGIN {_log('comment', 'new', 'new.discussion_id')} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS comments_changes_update
+    AFTER UPDATE OF body, parent_id, deleted, deleted_at ON comments
+    BEGIN {_log('comment', 'new', 'new.discussion_id')} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS comments_changes_delete AFTER DELETE ON comments
+    BEGIN {_log('comment', 'old', 'old.discussion_id')} END""",
+]
+
+for table, statements in ((models.Discussion.__table__, DISCUSSIONS_DDL), (models.Comment.__table__, COMMENTS_DDL)):
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def decode_since(since: Optional[str]) -> int:
+    if not since:
+        return 0
+    if since.isdigit():
+        return int(since)
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def changes_since(db: Session, since: Optional[str], discussion_id: Optional[int], limit: int) -> dict:
+    """The rows changed after ``since``, oldest change first, with their current state."""
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Change feed requires SQLite triggers")
+    after = decode_since(since)
+    query = db.query(models.Change).filter(models.Change.id > after)
+    if discussion_id is not None:
+        query = query.filter(models.Change.discussion_id == discussion_id)
+    entries = query.order_by(models.Change.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    rows: Dict[str, dict] = {}
+    for entity, model in (("discussion", models.Discussion), ("comment", models.Comment)):
+        ids = [e.entity_id for e in entries if e.entity == entity]
+        rows[entity] = {r.id: r for r in db.query(model).filter(model.id.in_(ids))} if ids else {}
+
+    items = []
+    for e in entries:
+        row = rows[e.entity].get(e.entity_id)
+        items.append({
+            "seq": e.id,
+            "type": e.entity,
+            "id": e.entity_id,
+            "discussion_id": e.discussion_id,
+            "removed": row is None,
+            e.entity: row,
+        })
+    next_cursor = str(entries[-1].id if entries else after)
+    return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
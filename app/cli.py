@@ -0,0 +1,132 @@
+"""Maintenance commands, run as ``python -m app.cli <command>``."""
+import argparse
+import sys
+import time
+from . import bulk, config, maintenance, schemas, search, sharding
+from .database import SessionLocal
+
+IMPORTERS = {
+    "users": (schemas.UserImport, bulk.import_users),
+    "discussions": (schemas.DiscussionImport, bulk.import_discussions),
+    "comments": (schemas.CommentImport, bulk.import_comments),
+}
+
+
+def recompute_stats(args) -> None:
+    with sharding.sessions() as dbs:
+        repaired = sum(maintenance.recompute_discussion_stats(db) for db in dbs)
+    print(f"Repaired comment stats of {repaired} discussion(s)")
+
+
+def redecay_hot(args) -> None:
+    with sharding.sessions() as dbs:
+        updated = sum(maintenance.redecay_hot_scores(db, top=args.top, batch_size=args.batch_size) for db in dbs)
+    print(f"Re-decayed hot scores of {updated} discussion(s)")
+
+
+def archive_deleted(args) -> None:
+    with sharding.sessions() as dbs:
+        for db in dbs:
+            report = maintenance.archive_deleted(
+                db, retention_days=args.retention_days, batch_size=args.batch_size, pause=args.pause,
+            )
+            print(
+                f"Archived {report['discussions']} discussion(s) and {report['comments']} comment(s) "
+                f"in {report['batches']} batch(es), {report['seconds']:.2f}s, {report['rows_per_s']} rows/s; "
+                f"kept {report['tombstones']} tombstone(s) with replies"
+            )
+
+
+def rebuild_search(args) -> None:
+    with sharding.sessions() as dbs:
+        indexed = sum(search.rebuild(db) for db in dbs)
+    print(f"Indexed {indexed} discussion(s) and comment(s)")
+
+
+def migrate_shards(args) -> None:
+    print(f"Upgraded {sharding.upgrade()} shard(s) to the head revision")
+
+
+def import_ndjson(args) -> None:
+    """Stream an NDJSON file into the database, one chunked transaction at a time."""
+    if sharding.enabled() and args.kind != "users":
+        sys.exit("Bulk imports of discussions and comments are not available with sharded storage")
+    model, importer = IMPORTERS[args.kind]
+    created = failed = 0
+    started = time.perf_counter()
+
+    def flush(items, lines):
+        nonlocal created, failed
+        with SessionLocal() as db:
+            result = importer(db, items, args.chunk_size)
+        created += result["created"]
+        for error in result["errors"]:
+            failed += 1
+            print(f"line {lines[error['index']]}: {error['detail']}", file=sys.stderr)
+
+    items, lines = [], []
+    with open(args.path, encoding="utf-8") as source:
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(model.parse_raw(line))
+                lines.append(number)
+            except ValueError as exc:
+                failed += 1
+                print(f"line {number}: {exc}", file=sys.stderr)
+            if len(items) >= args.chunk_size:
+                flush(items, lines)
+                items, lines = [], []
+    if items:
+        flush(items, lines)
+
+    elapsed = time.perf_counter() - started
+    print(f"Imported {created} {args.kind} ({failed} failed) in {elapsed:.2f}s, {created / elapsed:.0f} rows/s")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "recompute-stats",
+        help="rebuild Discussion.comment_count and last_activity_at from the comments",
+    ).set_defaults(func=recompute_stats)
+
+    redecay = commands.add_parser("redecay-hot", help="recompute time-decayed hot scores in bulk")
+    redecay.add_argument("--top", type=int, default=None, help="discussions to refresh (default: HOT_REDECAY_TOP)")
+    redecay.add_argument("--batch-size", type=int, default=1000)
+    redecay.set_defaults(func=redecay_hot)
+
+    archive = commands.add_parser(
+        "archive-deleted",
+        help="move discussions and comments deleted longer than the retention into the archive tables",
+    )
+    archive.add_argument("--retention-days", type=float, default=config.ARCHIVE_RETENTION_DAYS)
+    archive.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE)
+    archive.add_argument("--pause", type=float, default=config.ARCHIVE_BATCH_PAUSE, help="seconds between batches")
+    archive.set_defaults(func=archive_deleted)
+
+    commands.add_parser(
+        "rebuild-search",
+        help="rebuild the full-text search index from the live discussions and comments",
+    ).set_defaults(func=rebuild_search)
+
+    commands.add_parser(
+        "migrate-shards",
+        help="run the migrations on every database in SHARD_URLS (alembic upgrade head does the global one)",
+    ).set_defaults(func=migrate_shards)
+
+    importer = commands.add_parser("import", help="bulk import users, discussions or comments from NDJSON")
+    importer.add_argument("kind", choices=sorted(IMPORTERS))
+    importer.add_argument("path", help="file with one JSON object per line")
+    importer.add_argument("--chunk-size", type=int, default=config.BULK_CHUNK_SIZE)
+    importer.set_defaults(func=import_ndjson)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
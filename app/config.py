@@ -0,0 +1,103 @@
+import os
+
+
+def _flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+
+# Serve requests through SQLAlchemy's AsyncSession instead of blocking sessions
+# run in the threadpool. The async URL defaults to DATABASE_URL on aiosqlite.
+DB_ASYNC = _flag("DB_ASYNC")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+)
+
+# SQLite connection tuning, applied to every new connection (see database.py).
+SQLITE_PRAGMAS = _flag("SQLITE_PRAGMAS", True)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative means KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+
+# GET routes read through a pooled read-only engine while mutations share a
+# single writer connection, so writes queue in the app instead of on the lock.
+DB_SPLIT_READ_WRITE = _flag("DB_SPLIT_READ_WRITE", True)
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+# Sharded storage: comma-separated SQLAlchemy URLs of the shards holding the
+# discussions and comments (see app/sharding.py); DATABASE_URL then only holds
+# users and the id allocator. Ids are reserved ID_BLOCK_SIZE at a time.
+SHARD_URLS = os.getenv("SHARD_URLS", "")
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "100"))
+
+# In-process cache of rendered listing and thread pages, invalidated on writes.
+RESPONSE_CACHE = _flag("RESPONSE_CACHE", True)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+# Usernames by id, used to check authors on writes and for ?with_authors=true.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# Hot ranking: (comment_count + 1) / (age_hours + 2) ** HOT_GRAVITY, stored on
+# each discussion. The HOT_REDECAY_TOP highest scores are re-decayed every
+# HOT_REDECAY_INTERVAL seconds (0, the default, disables the in-process job,
+# which would otherwise run in every worker; run `python -m app.cli
+# redecay-hot` from cron instead).
+HOT_GRAVITY = float(os.getenv("HOT_GRAVITY", "1.8"))
+HOT_REDECAY_TOP = int(os.getenv("HOT_REDECAY_TOP", "1000"))
+HOT_REDECAY_INTERVAL = float(os.getenv("HOT_REDECAY_INTERVAL", "0"))
+
+# Compaction: rows soft-deleted more than ARCHIVE_RETENTION_DAYS ago move to the
+# archive tables in batches of ARCHIVE_BATCH_SIZE, with ARCHIVE_BATCH_PAUSE
+# seconds between batches, every ARCHIVE_INTERVAL seconds (0 disables the
+# in-process job; `python -m app.cli archive-deleted` does the same).
+ARCHIVE_RETENTION_DAYS = float(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.01"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "0"))
+
+# Bulk import endpoints: largest accepted request and rows per transaction.
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+# Rows fetched per round-trip (and written per chunk) by the streaming exports.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Group commit for create_comment: concurrent comments are written together in
+# one transaction once COMMENT_BATCH_WINDOW seconds pass or the batch is full.
+COMMENT_BATCHING = _flag("COMMENT_BATCHING")
+COMMENT_BATCH_MAX_ITEMS = int(os.getenv("COMMENT_BATCH_MAX_ITEMS", "100"))
+COMMENT_BATCH_WINDOW = float(os.getenv("COMMENT_BATCH_WINDOW", "0.005"))
+
+# Server-Sent Events of comment writes: events kept for Last-Event-ID resumes,
+# events a subscriber may lag behind before it is disconnected, seconds between
+# keepalive comments and the reconnect delay suggested to clients.
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "1024"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+EVENT_KEEPALIVE = float(os.getenv("EVENT_KEEPALIVE", "15"))
+EVENT_RETRY_MS = int(os.getenv("EVENT_RETRY_MS", "2000"))
+
+# Admission control (off unless ADMISSION_CONTROL=1): per-author rate of writes,
+# per-route rates as "METHOD /path/template=rate:burst,...", the cap on
+# concurrent expensive reads and the Retry-After sent when it is reached,
+# and the most author buckets kept.
+ADMISSION_CONTROL = _flag("ADMISSION_CONTROL")
+AUTHOR_WRITE_RATE = float(os.getenv("AUTHOR_WRITE_RATE", "2"))
+AUTHOR_WRITE_BURST = float(os.getenv("AUTHOR_WRITE_BURST", "20"))
+ROUTE_RATE_LIMITS = os.getenv("ROUTE_RATE_LIMITS", "")
+EXPENSIVE_READ_CONCURRENCY = int(os.getenv("EXPENSIVE_READ_CONCURRENCY", "16"))
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", "100000"))
+
+# Render listing, thread and search pages from column-only queries with orjson
+# instead of per-row pydantic validation (no effect if orjson is missing).
+FAST_JSON = _flag("FAST_JSON")
+
+# Requests slower than this many seconds are logged with their SQL (0 disables).
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "50"))
@@ -1,17 +1,123 @@
-from sqlalchemy import create_engine
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from typing import Generator
+from typing import AsyncGenerator, Callable, Generator, List, Optional, Tuple, TypeVar, Union
+from . import config
 
 
-DATABASE_URL = "sqlite:///./test.db"
+DATABASE_URL = config.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def sqlite_pragmas(readonly: bool = False) -> List[str]:
+    """PRAGMA statements run on every new SQLite connection."""
+    pragmas = [
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+    ]
+    if not readonly:
+        # The journal mode is stored in the database file, so the writer sets it.
+        pragmas.insert(0, f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def _on_connect(engine, pragmas: List[str]) -> None:
+    if not pragmas:
+        return
+
+    @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def make_engines(url: str, create=create_engine, pragmas: Optional[bool] = None, split: Optional[bool] = None) -> Tuple:
+    """Create the ``(writer, reader)`` engine pair for ``url``.
+
+    For a file-backed SQLite database the writer holds a single connection, so
+    mutations are serialized in the pool rather than fighting over the database
+    lock, and the reader is a pool of ``query_only`` connections. Other
+    databases, and in-memory SQLite, get one engine used for both.
+    """
+    pragmas = config.SQLITE_PRAGMAS if pragmas is None else pragmas
+    split = config.DB_SPLIT_READ_WRITE if split is None else split
+
+    backend = make_url(url)
+    sqlite = backend.get_backend_name() == "sqlite"
+    file_backed = sqlite and backend.database not in (None, "", ":memory:")
+    kwargs = {"connect_args": {"check_same_thread": False}} if sqlite and create is create_engine else {}
+
+    if not (split and file_backed):
+        engine = create(url, **kwargs)
+        _on_connect(engine, sqlite_pragmas() if sqlite and pragmas else [])
+        return engine, engine
+
+    writer = create(url, pool_size=1, max_overflow=0, **kwargs)
+    reader = create(url, pool_size=config.DB_READ_POOL_SIZE, **kwargs)
+    _on_connect(writer, sqlite_pragmas() if pragmas else [])
+    _on_connect(reader, (sqlite_pragmas(readonly=True) if pragmas else []) + ["PRAGMA query_only=ON"])
+    return writer, reader
+
+
+engine, read_engine = make_engines(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
+ReadSessionLocal = sessionmaker(bind=read_engine)
 Base = declarative_base()
 
-def get_db() -> Generator[Session, None, None]:
+if config.DB_ASYNC:
+    async_engine, async_read_engine = make_engines(config.ASYNC_DATABASE_URL, create_async_engine)
+else:
+    async_engine = async_read_engine = None
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, expire_on_commit=False)
+
+AnySession = Union[Session, AsyncSession]
+T = TypeVar("T")
+
+
+def get_sync_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_sync_read_db() -> Generator[Session, None, None]:
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+# Mutations depend on get_db (the writer), GET routes on get_read_db.
+get_db = get_async_db if config.DB_ASYNC else get_sync_db
+get_read_db = get_async_read_db if config.DB_ASYNC else get_sync_read_db
+
+
+async def run(db: AnySession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Call ``fn(session, *args, **kwargs)`` without blocking the event loop.
+
+    Route handlers keep their ORM code in plain functions taking a sync
+    ``Session``. With an ``AsyncSession`` they run through ``run_sync`` on the
+    async driver, otherwise in the threadpool as FastAPI would for a sync route.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -0,0 +1,144 @@
+"""In-process pub/sub of comment events, served as Server-Sent Events.
+
+Comment writes publish to the broker right after they commit, next to their
+cache invalidation; ``GET /discussions/{id}/stream`` subscribes. Every event
+gets an id from a process-wide sequence and is kept in a bounded history, so
+a client reconnecting with ``Last-Event-ID`` is replayed what it missed. If
+that is no longer in the history (or the id comes from another process) it
+receives a ``reset`` event and should refetch the thread.
+
+Each subscriber has a bounded queue. A subscriber that falls behind by more
+than ``EVENT_QUEUE_SIZE`` events is disconnected rather than buffered
+without limit; its EventSource reconnects and resumes from the history.
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, NamedTuple, Optional, Set
+from . import cache, config, schemas
+
+
+class Event(NamedTuple):
+    id: int
+    discussion_id: int
+    type: str
+    data: bytes
+
+
+def format_event(event: Event) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event.id, event.type.encode(), event.data)
+
+
+class Subscriber:
+    def __init__(self, discussion_id: int, maxsize: int):
+        self.discussion_id = discussion_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize)
+        self.overflowed = asyncio.Event()
+
+    def push(self, event: Event) -> None:
+        """Called on the subscriber's loop; gives up on the subscriber when it lags too far."""
+        if self.overflowed.is_set():
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed.set()
+
+
+class Broker:
+    """Fan-out of events to the subscribers of each discussion.
+
+    ``publish`` may be called from any thread (route functions run in the
+    threadpool); delivery is handed to each subscriber's event loop.
+    """
+
+    def __init__(self, history_size: int, queue_size: int):
+        self.queue_size = queue_size
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self.published = self.dropped = 0
+
+    def publish(self, discussion_id: int, type: str, data: bytes) -> None:
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, discussion_id, type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers.get(discussion_id, ()))
+            self.published += 1
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.push, event)
+
+    def subscribe(self, discussion_id: int, last_event_id: Optional[int] = None):
+        """Register a subscriber; returns it with the events to replay first.
+
+        ``None`` in place of the replay list means the client's position is
+        gone and it has to start over.
+        """
+        subscriber = Subscriber(discussion_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(discussion_id, set()).add(subscriber)
+            if last_event_id is None:
+                return subscriber, []
+            oldest = self._history[0].id if self._history else self._last_id + 1
+            if last_event_id > self._last_id or last_event_id < oldest - 1:
+                return subscriber, None
+            replay = [e for e in self._history if e.id > last_event_id and e.discussion_id == discussion_id]
+        return subscriber, replay
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.discussion_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.discussion_id]
+            if subscriber.overflowed.is_set():
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+broker = Broker(config.EVENT_HISTORY_SIZE, config.EVENT_QUEUE_SIZE)
+
+
+def publish_comment(type: str, comment) -> None:
+    """Publish a ``CommentOut`` rendering of ``comment`` (an ORM object or a dict)."""
+    discussion_id = comment["discussion_id"] if isinstance(comment, dict) else comment.discussion_id
+    broker.publish(discussion_id, type, cache.encode(schemas.CommentOut, comment))
+
+
+async def stream(discussion_id: int, last_event_id: Optional[int]) -> AsyncIterator[bytes]:
+    """The SSE body of one subscriber, until it disconnects or overflows."""
+    subscriber, replay = broker.subscribe(discussion_id, last_event_id)
+    try:
+        yield b"retry: %d\n\n" % config.EVENT_RETRY_MS
+        if replay is None:
+            yield b"event: reset\ndata: {}\n\n"
+            replay = []
+        for event in replay:
+            yield format_event(event)
+        while not subscriber.overflowed.is_set():
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), config.EVENT_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return -1  # unknown position: the client gets a reset
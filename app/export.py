@@ -0,0 +1,81 @@
+"""Streaming NDJSON exports.
+
+Rows are read with ``yield_per`` (``AsyncSession.stream`` in async mode) and
+written out one batch at a time, so memory stays flat however large the
+thread or forum is. Every line is a JSON object tagged with its ``type``.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Iterator, Union
+from . import config, models, schemas
+
+
+MEDIA_TYPE = "application/x-ndjson"
+
+USER_COLUMNS = [getattr(models.User, f) for f in schemas.UserOut.__fields__]
+DISCUSSION_COLUMNS = [getattr(models.Discussion, f) for f in schemas.DiscussionOut.__fields__]
+COMMENT_COLUMNS = [getattr(models.Comment, f) for f in schemas.CommentOut.__fields__]
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def line(type: str, row) -> bytes:
+    return (json.dumps({"type": type, **row}, default=_default, separators=(",", ":")) + "\n").encode()
+
+
+def users():
+    return "user", select(*USER_COLUMNS).order_by(models.User.id)
+
+
+def discussions():
+    return "discussion", select(*DISCUSSION_COLUMNS).order_by(models.Discussion.id)
+
+
+def comments(discussion_id: int = None):
+    stmt = select(*COMMENT_COLUMNS)
+    if discussion_id is None:
+        return "comment", stmt.order_by(models.Comment.id)
+    return "comment", (
+        stmt.where(models.Comment.discussion_id == discussion_id)
+        .order_by(models.Comment.created_at, models.Comment.id)
+    )
+
+
+def _sync_stream(db, queries) -> Iterator[bytes]:
+    for type, stmt in queries:
+        result = db.execute(stmt.execution_options(yield_per=config.EXPORT_BATCH_SIZE))
+        for rows in result.mappings().partitions():
+            yield b"".join(line(type, row) for row in rows)
+
+
+async def _async_stream(db: AsyncSession, queries) -> AsyncIterator[bytes]:
+    for type, stmt in queries:
+        result = await db.stream(stmt.execution_options(yield_per=config.EXPORT_BATCH_SIZE))
+        async for rows in result.mappings().partitions():
+            yield b"".join(line(type, row) for row in rows)
+
+
+def stream(db, *queries, head: bytes = b"") -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+    """NDJSON body for ``queries``, each a ``(type, select)`` pair, after ``head``.
+
+    A sync generator is iterated in the threadpool by StreamingResponse; with
+    an AsyncSession the rows come from a server-side async cursor instead.
+    """
+    if isinstance(db, AsyncSession):
+        async def body():
+            if head:
+                yield head
+            async for chunk in _async_stream(db, queries):
+                yield chunk
+    else:
+        def body():
+            if head:
+                yield head
+            yield from _sync_stream(db, queries)
+    return body()
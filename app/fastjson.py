@@ -0,0 +1,31 @@
+"""Opt-in fast path for rendering large listing and thread pages.
+
+With ``FAST_JSON`` on, the routes select only the columns of the response
+schema and hand plain dicts to orjson instead of validating one pydantic
+model per row and re-encoding it. The bodies are the same JSON; the
+``response_model`` declarations, and so the OpenAPI schemas, are unchanged.
+orjson is optional: without it the setting has no effect.
+"""
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from . import config
+
+
+def enabled() -> bool:
+    return config.FAST_JSON and orjson is not None
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse encoded by orjson; ``content`` must already be plain data."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
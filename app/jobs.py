@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Callable, List
+from . import config, maintenance, sharding
+
+logger = logging.getLogger(__name__)
+
+
+def _in_session(job: Callable[[Session], int]) -> int:
+    with sharding.sessions() as dbs:
+        return sum(job(db) for db in dbs)
+
+
+def archive_deleted(db: Session) -> int:
+    report = maintenance.archive_deleted(db)
+    return report["comments"] + report["discussions"]
+
+
+async def every(interval: float, job: Callable[[Session], int]) -> None:
+    """Run ``job(session)`` in the threadpool every ``interval`` seconds, forever."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            rows = await run_in_threadpool(_in_session, job)
+            logger.info("%s updated %d row(s)", job.__name__, rows)
+        except Exception:
+            logger.exception("Background job %s failed", job.__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the periodic maintenance jobs for the lifetime of the app."""
+    tasks: List[asyncio.Task] = []
+    if config.HOT_REDECAY_INTERVAL > 0:
+        tasks.append(asyncio.create_task(every(config.HOT_REDECAY_INTERVAL, maintenance.redecay_hot_scores)))
+    if config.ARCHIVE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(every(config.ARCHIVE_INTERVAL, archive_deleted)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
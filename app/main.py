@@ -1,11 +1,28 @@
-from fastapi import FastAPI
-from .database import Base, engine
-from .routes import users, discussions, comments
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
+from . import admission, cache, jobs, metrics, migrate, sharding
+from .database import engine
+from .routes import users, discussions, comments, search, export, changes
 
-Base.metadata.create_all(bind=engine)
+migrate.check(engine)
+sharding.check()
 
-app = FastAPI()
+app = FastAPI(lifespan=jobs.lifespan, dependencies=[Depends(admission.admit)])
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(discussions.router)
 app.include_router(comments.router)
+app.include_router(search.router)
+app.include_router(export.router)
+app.include_router(changes.router)
+
+
+@app.get("/cache/stats", tags=["cache"])
+def cache_stats():
+    return cache.responses.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["metrics"])
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
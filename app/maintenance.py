@@ -0,0 +1,186 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, and_, delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session, aliased
+from typing import Iterable, Optional
+from . import cache, config, models, ranking
+
+
+def recompute_discussion_stats(db: Session) -> int:
+    """Rebuild ``comment_count`` and ``last_activity_at`` from the comments table.
+
+    Only discussions whose stored values drifted are rewritten (and get a new
+    version, so cached pages and ETags move on). Returns the number repaired.
+    """
+    Discussion = models.Discussion
+    comment = aliased(models.Comment)
+    live_count = (
+        select(func.count(comment.id))
+        .where(comment.discussion_id == Discussion.id, comment.deleted.is_not(True))
+        .scalar_subquery()
+    )
+    last_activity = func.coalesce(
+        select(func.max(comment.created_at)).where(comment.discussion_id == Discussion.id).scalar_subquery(),
+        Discussion.created_at,
+    )
+    result = db.execute(
+        update(Discussion)
+        .where(or_(
+            Discussion.comment_count.is_distinct_from(live_count),
+            Discussion.last_activity_at.is_distinct_from(last_activity),
+        ))
+        .values(
+            comment_count=live_count,
+            last_activity_at=last_activity,
+            version=Discussion.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def redecay_hot_scores(
+    db: Session, now: Optional[datetime] = None, top: Optional[int] = None, batch_size: int = 1000
+) -> int:
+    """Recompute ``hot_score`` at ``now`` for the ``top`` highest-ranked discussions.
+
+    Writes only refresh the discussions they touch, so the stored scores of
+    quiet ones go stale (too high) until this runs. Only the front of the
+    ``?sort=hot`` order is rewritten, read from the score index, so the cost
+    is bounded by ``top`` (``HOT_REDECAY_TOP``) however large the table
+    grows. A stale score below the ``top``-th is too high already, so that
+    discussion cannot wrongly reach the front; one that climbs there as
+    others decay is refreshed by the next run. Rows are rewritten in
+    batches, each in its own short transaction.
+    """
+    now = now or datetime.utcnow()
+    top = top or config.HOT_REDECAY_TOP
+    Discussion = models.Discussion
+    rows = (
+        db.query(Discussion.id, Discussion.comment_count, Discussion.created_at)
+        .order_by(Discussion.hot_score.desc(), Discussion.id.desc())
+        .limit(top)
+        .all()
+    )
+    for start in range(0, len(rows), batch_size):
+        db.execute(
+            update(Discussion),
+            [
+                {"id": row.id, "hot_score": ranking.hot_score(row.comment_count, row.created_at, now)}
+                for row in rows[start:start + batch_size]
+            ],
+        )
+        db.commit()
+    return len(rows)
+
+
+def _archive(db: Session, model, archive, ids: Iterable[int], now: datetime) -> None:
+    """Copy rows ``ids`` of ``model`` into ``archive``, stamped with ``now``, and delete them."""
+    source = model.__table__
+    columns = [c.name for c in archive.__table__.columns if c.name != "archived_at"]
+    db.execute(insert(archive).from_select(
+        columns + ["archived_at"],
+        select(*(source.c[name] for name in columns), literal(now, DateTime)).where(source.c.id.in_(ids)),
+    ))
+    db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+
+
+def archive_deleted(
+    db: Session,
+    now: Optional[datetime] = None,
+    retention_days: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> dict:
+    """Move rows soft-deleted more than ``retention_days`` ago into the archive tables.
+
+    Runs in three phases, each in batches of at most ``batch_size`` rows that
+    commit on their own, with ``pause`` seconds between them so writers are
+    never locked out for long:
+
+    1. comments of expired discussions, live or not, since their thread is gone;
+    2. expired comments nobody replies to. A deleted comment that still has
+       replies stays as a tombstone so the thread keeps its shape; it is
+       archived by a later run once its replies are gone. Newest ids go first,
+       so a dead reply frees its dead parent within the same run;
+    3. expired discussions, now without comments.
+
+    Threads that lose tombstones get a new version, so cached pages and ETags
+    move on. The deletes also reach the change feed. Returns the rows moved,
+    the tombstones kept, the batch count and the throughput.
+    """
+    now = now or datetime.utcnow()
+    retention_days = config.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+    pause = config.ARCHIVE_BATCH_PAUSE if pause is None else pause
+    cutoff = now - timedelta(days=retention_days)
+    Discussion, Comment = models.Discussion, models.Comment
+    reply = aliased(Comment)
+    expired_discussion = and_(Discussion.deleted.is_(True), Discussion.deleted_at < cutoff)
+    expired_comment = and_(Comment.deleted.is_(True), Comment.deleted_at < cutoff)
+    has_replies = exists().where(reply.parent_id == Comment.id)
+    report = {"comments": 0, "discussions": 0, "tombstones": 0, "batches": 0}
+    started = time.perf_counter()
+
+    def committed(key: str, moved: int) -> None:
+        db.commit()
+        report[key] += moved
+        report["batches"] += 1
+        if pause:
+            time.sleep(pause)
+
+    orphaned = (
+        select(Comment.id)
+        .where(Comment.discussion_id.in_(select(Discussion.id).where(expired_discussion)))
+        .limit(batch_size)
+    )
+    while True:
+        ids = db.scalars(orphaned).all()
+        if not ids:
+            break
+        _archive(db, Comment, models.ArchivedComment, ids, now)
+        committed("comments", len(ids))
+
+    moved_in_pass = True
+    while moved_in_pass:
+        moved_in_pass = False
+        last_id = None
+        while True:
+            query = select(Comment.id, Comment.discussion_id).where(expired_comment, ~has_replies)
+            if last_id is not None:
+                query = query.where(Comment.id < last_id)
+            rows = db.execute(query.order_by(Comment.id.desc()).limit(batch_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            discussion_ids = {row.discussion_id for row in rows}
+            _archive(db, Comment, models.ArchivedComment, [row.id for row in rows], now)
+            db.execute(
+                update(Discussion)
+                .where(Discussion.id.in_(discussion_ids))
+                .values(version=Discussion.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            committed("comments", len(rows))
+            cache.responses.invalidate(*(cache.thread_tag(id) for id in discussion_ids))
+            moved_in_pass = True
+
+    empty = (
+        select(Discussion.id)
+        .where(expired_discussion, ~exists().where(Comment.discussion_id == Discussion.id))
+        .limit(batch_size)
+    )
+    while True:
+        ids = db.scalars(empty).all()
+        if not ids:
+            break
+        _archive(db, Discussion, models.ArchivedDiscussion, ids, now)
+        committed("discussions", len(ids))
+        cache.responses.invalidate(cache.LISTING_HEAD, *(cache.discussion_tag(id) for id in ids))
+
+    report["tombstones"] = db.scalar(select(func.count()).select_from(Comment).where(expired_comment, has_replies))
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_s"] = round((report["comments"] + report["discussions"]) / elapsed) if elapsed else 0
+    return report
@@ -0,0 +1,172 @@
+"""Per-request latency and SQL instrumentation, exported in Prometheus text format.
+
+``MetricsMiddleware`` times every request by route template. SQLAlchemy
+cursor events, registered on every engine, attribute each statement and its
+duration to the request that ran it through a context variable. That still
+works from the threadpool and from ``AsyncSession.run_sync``, since both run
+in a copy of the request's context.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Dict, List, Optional, Sequence, Tuple
+from . import admission, cache, config, events, usernames
+
+logger = logging.getLogger("app.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current() -> Optional[RequestStats]:
+    """Stats of the request being served, or None outside of a request."""
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[Tuple[str, str], ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, hits in zip(self.buckets, counts):
+                    cumulative += hits
+                    lines.append(f"{self.name}_bucket{_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency by route.", LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "SQL statements executed per request.", QUERY_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS)
+
+
+# A connection runs one statement at a time, so one start time is enough. A
+# failing statement never reaches after_cursor_execute; the next one
+# overwrites its start time instead of leaving it behind.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if config.SLOW_REQUEST_SECONDS > 0 and len(stats.statements) < config.SLOW_REQUEST_MAX_STATEMENTS:
+        stats.statements.append(f"[{elapsed * 1000:.1f}ms] {statement}")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, SQL count and SQL time per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = (("method", scope["method"]), ("route", route), ("status", str(status)))
+            REQUEST_SECONDS.observe(labels, elapsed)
+            REQUEST_QUERIES.observe(labels[:2], stats.queries)
+            REQUEST_DB_SECONDS.observe(labels[:2], stats.db_seconds)
+            if 0 < config.SLOW_REQUEST_SECONDS <= elapsed:
+                logger.warning(
+                    "Slow request %s %s: %.3fs, %d queries, %.3fs in SQL\n%s",
+                    scope["method"], scope["path"], elapsed, stats.queries, stats.db_seconds,
+                    "\n".join(stats.statements),
+                )
+
+
+def render() -> str:
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for prefix, lru in (("response_cache", cache.responses), ("user_cache", usernames.names)):
+        for key, value in lru.stats().items():
+            name = f"{prefix}_{key}" if key in ("size", "maxsize") else f"{prefix}_{key}_total"
+            kind = "gauge" if key in ("size", "maxsize") else "counter"
+            lines.extend([f"# TYPE {name} {kind}", f"{name} {value}"])
+    stream = events.broker.stats()
+    lines.extend([
+        "# TYPE event_stream_subscribers gauge", f"event_stream_subscribers {stream['subscribers']}",
+        "# TYPE event_stream_published_total counter", f"event_stream_published_total {stream['published']}",
+        "# TYPE event_stream_dropped_total counter", f"event_stream_dropped_total {stream['dropped']}",
+    ])
+    limits = admission.stats()
+    lines.extend([
+        "# TYPE admission_author_keys gauge", f"admission_author_keys {limits['author_keys']}",
+        "# TYPE admission_expensive_reads_active gauge", f"admission_expensive_reads_active {limits['expensive_active']}",
+        "# TYPE admission_rejected_total counter",
+        f'admission_rejected_total{{reason="author"}} {limits["author_rejected"]}',
+        f'admission_rejected_total{{reason="route"}} {limits["route_rejected"]}',
+        f'admission_rejected_total{{reason="concurrency"}} {limits["expensive_rejected"]}',
+    ])
+    return "\n".join(lines) + "\n"
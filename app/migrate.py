@@ -0,0 +1,51 @@
+"""Schema versioning with Alembic (scripts in ``migrations/``).
+
+Tables are no longer created when the app is imported: ``alembic upgrade
+head`` brings a database to the current schema, and startup only checks that
+the database is at the head revision, a single query.
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def include_name(name: Optional[str], type_: str, parent_names: dict) -> bool:
+    """Leave the FTS5 tables, which the migrations manage by hand, out of autogenerate."""
+    return not (type_ == "table" and name is not None and "_fts" in name)
+
+
+def alembic_config() -> Config:
+    cfg = Config(os.path.join(ROOT, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    return cfg
+
+
+def head() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current(engine: Engine) -> Optional[str]:
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade(engine: Engine, revision: str = "head") -> None:
+    cfg = alembic_config()
+    with engine.begin() as conn:
+        cfg.attributes["connection"] = conn
+        command.upgrade(cfg, revision)
+
+
+def check(engine: Engine) -> None:
+    """Refuse to start on a database that is not at the head revision."""
+    found, expected = current(engine), head()
+    if found != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {found}, the app needs {expected}; run `alembic upgrade head`"
+        )
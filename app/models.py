@@ -1,5 +1,5 @@
-# pylint: disable=not-callable
-from sqlalchemy import Boolean, Column, Integer, String, Text, ForeignKey, DateTime, func
+from datetime import datetime
+from sqlalchemy import Boolean, Column, Integer, Float, String, Text, ForeignKey, DateTime, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -14,9 +14,42 @@ class Discussion(Base):
     title = Column(String)
     body = Column(Text)
     author_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
     deleted = Column(Boolean, default=False)
     deleted_at = Column(DateTime, nullable=True)
+    # Bumped by every write to the discussion or its comments; drives ETags.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Maintained by the comment routes; `python -m app.cli recompute-stats` repairs drift.
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Never NULL, so ?sort=active always has a keyset position to page from.
+    last_activity_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Time-decayed rank for ?sort=hot, see app/ranking.py.
+    hot_score = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_discussions_created_at_id", "created_at", "id"),
+        Index("ix_discussions_hot_score_id", "hot_score", "id"),
+        Index("ix_discussions_comment_count_id", "comment_count", "id"),
+        Index("ix_discussions_last_activity_at_id", "last_activity_at", "id"),
+        # A user's discussions, newest first (GET /users/{id}/discussions).
+        Index("ix_discussions_author_id_created_at_id", "author_id", "created_at", "id"),
+        # The same, live discussions only: the feed's default skips deleted ones.
+        Index(
+            "ix_discussions_author_id_live",
+            "author_id",
+            "created_at",
+            "id",
+            sqlite_where=text("deleted IS NOT 1"),
+            postgresql_where=text("deleted IS NOT TRUE"),
+        ),
+        # Soft-deleted rows only, for the archive job (see maintenance.archive_deleted).
+        Index(
+            "ix_discussions_deleted_at_dead",
+            "deleted_at",
+            sqlite_where=text("deleted IS 1"),
+            postgresql_where=text("deleted IS TRUE"),
+        ),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -24,7 +57,71 @@ class Comment(Base):
     body = Column(Text)
     author_id = Column(Integer, ForeignKey("users.id"))
     discussion_id = Column(Integer, ForeignKey("discussions.id"))
-    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     deleted = Column(Boolean, default=False)
     deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_comments_discussion_id_created_at_id", "discussion_id", "created_at", "id"),
+        Index("ix_comments_author_id_created_at_id", "author_id", "created_at", "id"),
+        # Live comments only: counting them for the stats is an index-only scan.
+        Index(
+            "ix_comments_discussion_id_live",
+            "discussion_id",
+            sqlite_where=text("deleted IS NOT 1"),
+            postgresql_where=text("deleted IS NOT TRUE"),
+        ),
+        Index(
+            "ix_comments_deleted_at_dead",
+            "deleted_at",
+            sqlite_where=text("deleted IS 1"),
+            postgresql_where=text("deleted IS TRUE"),
+        ),
+    )
+
+class ArchivedDiscussion(Base):
+    """Discussions moved out of ``discussions`` once deleted for longer than the retention."""
+    __tablename__ = "discussions_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String)
+    body = Column(Text)
+    author_id = Column(Integer)
+    created_at = Column(DateTime)
+    deleted_at = Column(DateTime)
+    comment_count = Column(Integer)
+    last_activity_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+class ArchivedComment(Base):
+    __tablename__ = "comments_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    body = Column(Text)
+    author_id = Column(Integer)
+    discussion_id = Column(Integer, index=True)
+    parent_id = Column(Integer)
+    created_at = Column(DateTime)
+    deleted = Column(Boolean)
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+class Change(Base):
+    """Latest change of every discussion and comment, filled by triggers (see app/changes.py)."""
+    __tablename__ = "changes"
+    # AUTOINCREMENT: ids are sync cursors and must never be reused.
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    discussion_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("entity", "entity_id"),
+        Index("ix_changes_discussion_id_id", "discussion_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+class IdSequence(Base):
+    """Next free id of each sequence handed out by the sharded mode's allocator (see app/sharding.py)."""
+    __tablename__ = "id_sequences"
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
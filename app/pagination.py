@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from typing import Optional, Tuple, Union
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SortValue = Union[datetime, int, float]
+
+
+def encode_cursor(value: SortValue, id: int) -> str:
+    """Encode the (sort value, id) keyset position of a row as an opaque token."""
+    if isinstance(value, datetime):
+        raw = ["t", value.isoformat(), id]
+    else:
+        raw = ["n", value, id]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[SortValue, int]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, value, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if kind == "t":
+            return datetime.fromisoformat(value), int(id)
+        if kind == "n" and isinstance(value, (int, float)):
+            return value, int(id)
+    except (ValueError, TypeError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, key_col, id_col, cursor: Optional[str], limit: int, descending: bool = False):
+    """Apply a keyset page to ``query`` and return ``(rows, next_cursor)``.
+
+    Rows are ordered by ``(key_col, id_col)`` and the page starts strictly
+    after the position encoded in ``cursor``. One extra row is fetched to learn
+    whether another page exists, so no COUNT query is needed.
+    """
+    position = decode_cursor(cursor)
+    key = (key_col, id_col)
+    if position is not None:
+        after = tuple_(*key) < position if descending else tuple_(*key) > position
+        query = query.filter(after)
+    order = [c.desc() for c in key] if descending else list(key)
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, key_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
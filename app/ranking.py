@@ -0,0 +1,27 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from . import config, models
+
+
+class DiscussionSort(str, Enum):
+    new = "new"
+    hot = "hot"
+    top = "top"
+    active = "active"
+
+
+# Each listing order is a descending index range scan over (column, id).
+SORT_COLUMNS = {
+    DiscussionSort.new: models.Discussion.created_at,
+    DiscussionSort.hot: models.Discussion.hot_score,
+    DiscussionSort.top: models.Discussion.comment_count,
+    DiscussionSort.active: models.Discussion.last_activity_at,
+}
+
+
+def hot_score(comment_count: int, created_at: datetime, now: Optional[datetime] = None) -> float:
+    """Comment activity decayed by the discussion's age, Hacker News style."""
+    now = now or datetime.utcnow()
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    return (comment_count + 1) / (age_hours + 2) ** config.HOT_GRAVITY
@@ -0,0 +1,20 @@
+from app import changes, database, schemas, sharding
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+router = APIRouter(prefix="/changes", tags=["changes"], dependencies=[Depends(sharding.require_unsharded)])
+
+
+@router.get("/", response_model=schemas.ChangePage)
+async def list_changes(
+    since: Optional[str] = None,
+    discussion_id: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=2000),
+    db: database.AnySession = Depends(database.get_read_db)
+):
+    """Discussions and comments changed after the ``since`` cursor, tombstones included.
+
+    Start without ``since`` and pass each page's ``next_cursor`` back; an
+    empty page still returns the cursor to resume from later.
+    """
+    return await database.run(db, changes.changes_since, since, discussion_id, limit)
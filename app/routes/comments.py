@@ -1,37 +1,187 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import literal, select
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, database
+from typing import List, Optional
+from .. import batching, bulk, cache, config, events, export, fastjson, models, ranking, schemas, database, sharding, threads, usernames, versions
+from ..pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 @router.post("/discussion/{discussion_id}", response_model=schemas.CommentOut)
-def create_comment(discussion_id: int, comment: schemas.CommentCreate, author_id: int, db: Session = Depends(database.get_db)):
-    author = db.query(models.User).get(author_id)
-    if not author:
+async def create_comment(discussion_id: int, comment: schemas.CommentCreate, author_id: int, db: database.AnySession = Depends(sharding.get_discussion_db)):
+    # Batches go through the bulk importer, which leaves ids to the database.
+    if config.COMMENT_BATCHING and not sharding.enabled():
+        return await comment_batches.submit((discussion_id, comment, author_id))
+    return await database.run(db, _create_comment, discussion_id, comment, author_id)
+
+
+def _create_comment(db: Session, discussion_id: int, comment: schemas.CommentCreate, author_id: int):
+    if not usernames.exists(db, author_id):
         raise HTTPException(status_code=404, detail="Author not found")
+    # The discussion's stats and the parent's discussion in one query.
+    parent_discussion_id = (
+        select(models.Comment.discussion_id).where(models.Comment.id == comment.parent_id).scalar_subquery()
+        if comment.parent_id is not None else literal(None)
+    )
+    discussion = db.execute(
+        select(models.Discussion.comment_count, models.Discussion.created_at, parent_discussion_id.label("parent_discussion_id"))
+        .where(models.Discussion.id == discussion_id)
+    ).first()
+    if not discussion:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    if comment.parent_id is not None and discussion.parent_discussion_id != discussion_id:
+        raise HTTPException(status_code=404, detail="Parent comment not found in discussion")
+    now = datetime.utcnow()
     db_comment = models.Comment(
         body=comment.body,
         author_id=author_id,
         discussion_id=discussion_id,
         parent_id=comment.parent_id,
+        created_at=now,
     )
     db.add(db_comment)
+    versions.bump(
+        db,
+        discussion_id,
+        comment_count=models.Discussion.comment_count + 1,
+        last_activity_at=now,
+        hot_score=ranking.hot_score(discussion.comment_count + 1, discussion.created_at, now),
+    )
     db.commit()
     db.refresh(db_comment)
+    cache.responses.invalidate(cache.thread_tag(discussion_id), cache.discussion_tag(discussion_id))
+    events.publish_comment("comment_created", db_comment)
     return db_comment
 
 
-@router.get("/discussion/{discussion_id}", response_model=List[schemas.CommentOut])
-def get_comments(discussion_id: int, db: Session = Depends(database.get_db)):
-    return db.query(models.Comment).filter_by(discussion_id=discussion_id).all()
+def _create_comments(db: Session, requests: List[tuple]) -> list:
+    """Write a batch of ``(discussion_id, comment, author_id)`` requests in one transaction.
+
+    The bulk importer validates them with the same checks as ``_create_comment``,
+    inserts them and updates each discussion's stats once. Returns the created
+    comment, or the error, of every request.
+    """
+    now = datetime.utcnow()
+    items = [
+        schemas.CommentImport(**comment.dict(), discussion_id=discussion_id, author_id=author_id, created_at=now)
+        for discussion_id, comment, author_id in requests
+    ]
+    result = bulk.import_comments(db, items, chunk_size=len(items))
+    errors = {error["index"]: error["detail"] for error in result["errors"]}
+    created = [
+        HTTPException(status_code=404, detail=errors[i]) if i in errors
+        else dict(items[i].dict(), id=id, deleted=False, deleted_at=None)
+        for i, id in enumerate(result["ids"])
+    ]
+    for comment in created:
+        if isinstance(comment, dict):
+            events.publish_comment("comment_created", comment)
+    return created
+
+
+comment_batches = batching.GroupCommit(
+    _create_comments,
+    config.COMMENT_BATCH_MAX_ITEMS,
+    config.COMMENT_BATCH_WINDOW,
+    database.AsyncSessionLocal if config.DB_ASYNC else database.SessionLocal,
+)
+
+
+@router.post("/bulk", response_model=schemas.BulkResult, dependencies=[Depends(sharding.require_unsharded)])
+async def create_comments_bulk(comments: List[schemas.CommentImport], db: database.AnySession = Depends(database.get_db)):
+    bulk.check_size(comments)
+    return await database.run(db, bulk.import_comments, comments, config.BULK_CHUNK_SIZE)
+
+
+@router.get("/discussion/{discussion_id}", response_model=schemas.CommentPage)
+async def get_comments(
+    discussion_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    with_authors: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: database.AnySession = Depends(sharding.get_discussion_read_db)
+):
+    return await _thread_response(
+        db,
+        discussion_id,
+        if_none_match,
+        ("comments", discussion_id, cursor, limit, with_authors),
+        schemas.CommentPage,
+        lambda: database.run(db, _get_comments, discussion_id, cursor, limit, with_authors),
+    )
+
+
+def _get_comments(db: Session, discussion_id: int, cursor: Optional[str], limit: int, with_authors: bool = False):
+    fast = fastjson.enabled()
+    query = db.query(*export.COMMENT_COLUMNS) if fast else db.query(models.Comment)
+    items, next_cursor = paginate(
+        query.filter(models.Comment.discussion_id == discussion_id),
+        models.Comment.created_at,
+        models.Comment.id,
+        cursor,
+        limit,
+    )
+    if fast:
+        items = [row._asdict() for row in items]
+    authors = usernames.of_authors(db, items) if with_authors else None
+    return {"items": items, "next_cursor": next_cursor, "authors": authors}
+
+
+@router.get("/discussion/{discussion_id}/tree", response_model=schemas.CommentTree)
+async def get_comment_tree(
+    discussion_id: int,
+    max_depth: int = Query(8, ge=0, le=64),
+    max_children: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    with_authors: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: database.AnySession = Depends(sharding.get_discussion_read_db)
+):
+    async def compute():
+        rows = await database.run(db, threads.fetch_thread, discussion_id, max_depth, fastjson.enabled())
+        items, more_replies = threads.build_tree(rows, max_children)
+        authors = None
+        if with_authors:
+            authors = await database.run(db, usernames.of_authors, [comment for comment, _, _ in rows])
+        return {"discussion_id": discussion_id, "items": items, "more_replies": more_replies, "authors": authors}
+
+    return await _thread_response(
+        db,
+        discussion_id,
+        if_none_match,
+        ("tree", discussion_id, max_depth, max_children, with_authors),
+        schemas.CommentTree,
+        compute,
+    )
+
+
+async def _thread_response(db, discussion_id: int, if_none_match: Optional[str], key: tuple, model, compute):
+    """Answer a thread read with 304 if the client's ETag is current, else from the cache.
+
+    The discussion's version is read before the comments, so the ETag can
+    only be older than the body it is sent with, never newer.
+    """
+    version = await database.run(db, versions.current, discussion_id)
+    if version is None:
+        return await cache.cached(key, model, compute, lambda data: [cache.thread_tag(discussion_id)])
+
+    etag = versions.thread_etag(discussion_id, version)
+    if versions.matches(if_none_match, etag):
+        return versions.not_modified(etag)
+    response = await cache.cached(key + (version,), model, compute, lambda data: [cache.thread_tag(discussion_id)])
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.patch("/{comment_id}")
-def update_comment(comment_id: int, body: dict, author_id: int, db: Session = Depends(database.get_db)):
-    comment = db.query(models.Comment).get(comment_id)
+async def update_comment(comment_id: int, body: dict, author_id: int, db: database.AnySession = Depends(sharding.get_comment_db)):
+    return await database.run(db, _update_comment, comment_id, body, author_id)
+
+
+def _update_comment(db: Session, comment_id: int, body: dict, author_id: int):
+    comment = db.get(models.Comment, comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     if comment.author_id != author_id:
@@ -40,20 +190,37 @@ def update_comment(comment_id: int, body: dict, author_id: int, db: Session = De
     if "body" in body:
         comment.body = body["body"]
 
+    versions.bump(db, comment.discussion_id)
     db.commit()
     db.refresh(comment)
+    cache.responses.invalidate(cache.thread_tag(comment.discussion_id))
+    events.publish_comment("comment_updated", comment)
     return comment
 
 
 @router.delete("/{comment_id}")
-def soft_delete_comment(comment_id: int, author_id: int, db: Session = Depends(database.get_db)):
-    comment = db.query(models.Comment).get(comment_id)
+async def soft_delete_comment(comment_id: int, author_id: int, db: database.AnySession = Depends(sharding.get_comment_db)):
+    return await database.run(db, _soft_delete_comment, comment_id, author_id)
+
+
+def _soft_delete_comment(db: Session, comment_id: int, author_id: int):
+    comment = db.get(models.Comment, comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     if comment.author_id != author_id:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
+    if comment.deleted:
+        versions.bump(db, comment.discussion_id)
+    else:
+        stats = dict(comment_count=models.Discussion.comment_count - 1)
+        discussion = db.get(models.Discussion, comment.discussion_id)
+        if discussion:
+            stats["hot_score"] = ranking.hot_score(discussion.comment_count - 1, discussion.created_at)
+        versions.bump(db, comment.discussion_id, **stats)
     comment.deleted = True
     comment.deleted_at = datetime.utcnow()
     db.commit()
+    cache.responses.invalidate(cache.thread_tag(comment.discussion_id), cache.discussion_tag(comment.discussion_id))
+    events.publish_comment("comment_deleted", comment)
     return {"message": "Comment marked as deleted"}
@@ -1,36 +1,144 @@
-from app import models, schemas, database
+from app import bulk, cache, config, events, export, fastjson, models, ranking, schemas, database, sharding, usernames, versions
+from app.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix="/discussions", tags=["discussions"])
 
 @router.post("/", response_model=schemas.DiscussionOut)
-def create_discussion(discussion: schemas.DiscussionCreate, author_id: int, db: Session = Depends(database.get_db)):
-    author = db.query(models.User).get(author_id)
-    if not author:
+async def create_discussion(discussion: schemas.DiscussionCreate, author_id: int, db: database.AnySession = Depends(database.get_db)):
+    if sharding.enabled():
+        # The id decides the shard, so it is allocated first.
+        discussion_id = await run_in_threadpool(sharding.shards.ids.next, "discussions")
+        index = sharding.shards.index(discussion_id)
+        return await sharding.run_on(index, _create_discussion, discussion, author_id, discussion_id)
+    return await database.run(db, _create_discussion, discussion, author_id)
+
+
+def _create_discussion(db: Session, discussion: schemas.DiscussionCreate, author_id: int, discussion_id: Optional[int] = None):
+    if not usernames.exists(db, author_id):
         raise HTTPException(status_code=404, detail="Author not found")
-    db_disc = models.Discussion(**discussion.dict(), author_id=author_id)
+    now = datetime.utcnow()
+    db_disc = models.Discussion(
+        id=discussion_id,
+        **discussion.dict(),
+        author_id=author_id,
+        created_at=now,
+        last_activity_at=now,
+        hot_score=ranking.hot_score(0, now, now),
+    )
     db.add(db_disc)
     db.commit()
     db.refresh(db_disc)
+    cache.responses.invalidate(cache.LISTING_HEAD)
     return db_disc
 
 
-@router.get("/", response_model=List[schemas.DiscussionOut])
-def list_discussions(db: Session = Depends(database.get_db)):
-    return db.query(models.Discussion).all()
+@router.post("/bulk", response_model=schemas.BulkResult, dependencies=[Depends(sharding.require_unsharded)])
+async def create_discussions_bulk(discussions: List[schemas.DiscussionImport], db: database.AnySession = Depends(database.get_db)):
+    bulk.check_size(discussions)
+    return await database.run(db, bulk.import_discussions, discussions, config.BULK_CHUNK_SIZE)
+
+
+@router.get("/", response_model=schemas.DiscussionPage)
+async def list_discussions(
+    sort: ranking.DiscussionSort = ranking.DiscussionSort.new,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    with_authors: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: database.AnySession = Depends(database.get_read_db)
+):
+    if sharding.enabled():
+        pages = await sharding.gather(_listing_keys, sort, cursor, limit)
+        keys, next_cursor = sharding.merge_pages(pages, ranking.SORT_COLUMNS[sort], limit)
+        compute = lambda: _list_sharded(ids, next_cursor, with_authors)
+    else:
+        keys, next_cursor = await database.run(db, _listing_keys, sort, cursor, limit)
+        compute = lambda: database.run(db, _list_discussions, ids, next_cursor, with_authors)
+    etag = versions.page_etag(((key.id, key.version) for key in keys), next_cursor)
+    if versions.matches(if_none_match, etag):
+        return versions.not_modified(etag)
+
+    ids = [key.id for key in keys]
+    response = await cache.cached(
+        ("discussions", etag, with_authors),
+        schemas.DiscussionPage,
+        compute,
+        lambda page: [cache.discussion_tag(id) for id in ids] + ([] if cursor else [cache.LISTING_HEAD]),
+    )
+    response.headers["ETag"] = etag
+    return response
+
+
+def _listing_keys(db: Session, sort: ranking.DiscussionSort, cursor: Optional[str], limit: int):
+    """Select only the ids and versions of a listing page."""
+    sort_col = ranking.SORT_COLUMNS[sort]
+    return paginate(
+        db.query(models.Discussion.id, sort_col, models.Discussion.version),
+        sort_col,
+        models.Discussion.id,
+        cursor,
+        limit,
+        descending=True,
+    )
+
+
+def _list_discussions(db: Session, ids: List[int], next_cursor: Optional[str], with_authors: bool = False):
+    if fastjson.enabled():
+        query = db.query(*export.DISCUSSION_COLUMNS).filter(models.Discussion.id.in_(ids))
+        rows = {row.id: row._asdict() for row in query}
+    else:
+        rows = {d.id: d for d in db.query(models.Discussion).filter(models.Discussion.id.in_(ids))}
+    items = [rows[id] for id in ids if id in rows]
+    authors = usernames.of_authors(db, items) if with_authors else None
+    return {"items": items, "next_cursor": next_cursor, "authors": authors}
+
+
+async def _list_sharded(ids: List[int], next_cursor: Optional[str], with_authors: bool):
+    """``_list_discussions`` on every shard, put back in the order of ``ids``."""
+    pages = await sharding.gather(_list_discussions, ids, next_cursor, with_authors)
+    rows = {}
+    for page in pages:
+        for item in page["items"]:
+            rows[item["id"] if isinstance(item, dict) else item.id] = item
+    authors = {k: v for page in pages for k, v in page["authors"].items()} if with_authors else None
+    return {"items": [rows[id] for id in ids if id in rows], "next_cursor": next_cursor, "authors": authors}
+
+
+@router.get("/{discussion_id}/stream", response_class=StreamingResponse)
+async def stream_discussion(
+    discussion_id: int,
+    last_event_id: Optional[str] = Header(None),
+    # Released before streaming starts, so open streams do not hold connections.
+    db: database.AnySession = Depends(sharding.get_discussion_read_db, scope="function"),
+):
+    """Server-Sent Events for every comment created, edited or deleted in the discussion."""
+    if await database.run(db, versions.current, discussion_id) is None:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    return StreamingResponse(
+        events.stream(discussion_id, events.parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.patch("/{discussion_id}", response_model=schemas.DiscussionOut)
-def update_discussion(
+async def update_discussion(
     discussion_id: int,
     update_data: dict,
     author_id: int,
-    db: Session = Depends(database.get_db)
+    db: database.AnySession = Depends(sharding.get_discussion_db)
 ):
-    discussion = db.query(models.Discussion).get(discussion_id)
+    return await database.run(db, _update_discussion, discussion_id, update_data, author_id)
+
+
+def _update_discussion(db: Session, discussion_id: int, update_data: dict, author_id: int):
+    discussion = db.get(models.Discussion, discussion_id)
     if not discussion:
         raise HTTPException(status_code=404, detail="Discussion not found")
     if discussion.author_id != author_id:
@@ -41,14 +149,20 @@ def update_discussion(
     if "body" in update_data:
         discussion.body = update_data["body"]
 
+    versions.bump(db, discussion_id)
     db.commit()
     db.refresh(discussion)
+    cache.responses.invalidate(cache.discussion_tag(discussion_id))
     return discussion
 
 
 @router.delete("/{discussion_id}")
-def soft_delete_comment(discussion_id: int, author_id: int, db: Session = Depends(database.get_db)):
-    discussion = db.query(models.Discussion).get(discussion_id)
+async def soft_delete_comment(discussion_id: int, author_id: int, db: database.AnySession = Depends(sharding.get_discussion_db)):
+    return await database.run(db, _soft_delete_discussion, discussion_id, author_id)
+
+
+def _soft_delete_discussion(db: Session, discussion_id: int, author_id: int):
+    discussion = db.get(models.Discussion, discussion_id)
     if not discussion:
         raise HTTPException(status_code=404, detail="Discussion not found")
     if discussion.author_id != author_id:
@@ -56,5 +170,7 @@ def soft_delete_comment(discussion_id: int, author_id: int, db: Session = Depend
 
     discussion.deleted = True
     discussion.deleted_at = datetime.utcnow()
+    versions.bump(db, discussion_id)
     db.commit()
+    cache.responses.invalidate(cache.discussion_tag(discussion_id))
     return {"message": "Discussion marked as deleted"}
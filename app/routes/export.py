@@ -0,0 +1,31 @@
+from app import database, export, models, sharding
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+router = APIRouter(tags=["export"])
+
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(sharding.require_unsharded)])
+async def export_forum(db: database.AnySession = Depends(database.get_read_db)):
+    """Every user, discussion and comment as NDJSON, deleted ones included."""
+    body = export.stream(db, export.users(), export.discussions(), export.comments())
+    return StreamingResponse(body, media_type=export.MEDIA_TYPE)
+
+
+@router.get("/discussions/{discussion_id}/export", response_class=StreamingResponse)
+async def export_discussion(discussion_id: int, db: database.AnySession = Depends(sharding.get_discussion_read_db)):
+    """The discussion followed by all of its comments, oldest first, as NDJSON."""
+    head = await database.run(db, _discussion_line, discussion_id)
+    body = export.stream(db, export.comments(discussion_id), head=head)
+    return StreamingResponse(body, media_type=export.MEDIA_TYPE)
+
+
+def _discussion_line(db: Session, discussion_id: int) -> bytes:
+    row = db.execute(
+        select(*export.DISCUSSION_COLUMNS).where(models.Discussion.id == discussion_id)
+    ).mappings().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+    return export.line("discussion", row)
@@ -0,0 +1,24 @@
+from app import database, fastjson, schemas, search, sharding
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from enum import Enum
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+router = APIRouter(prefix="/search", tags=["search"], dependencies=[Depends(sharding.require_unsharded)])
+
+
+class SearchType(str, Enum):
+    discussions = "discussions"
+    comments = "comments"
+
+
+@router.get("/", response_model=schemas.SearchPage)
+async def search_forum(
+    q: str = Query(..., min_length=1, max_length=256),
+    type: SearchType = SearchType.discussions,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: database.AnySession = Depends(database.get_read_db)
+):
+    page = await database.run(db, search.search, q, type.value, cursor, limit)
+    return fastjson.ORJSONResponse(page) if fastjson.enabled() else page
@@ -1,13 +1,19 @@
-from app import models, schemas, database
-from fastapi import APIRouter, Depends, HTTPException
+from app import bulk, config, models, schemas, database, sharding, usernames
+from app.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from typing import List, Optional
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("/", response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def create_user(user: schemas.UserCreate, db: database.AnySession = Depends(database.get_db)):
+    return await database.run(db, _create_user, user)
+
+
+def _create_user(db: Session, user: schemas.UserCreate):
     db_user = models.User(username=user.username)
     db.add(db_user)
     try:
@@ -16,4 +22,58 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
         db.rollback()
         raise HTTPException(status_code=400, detail="Username already taken")
     db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    usernames.remember(db_user.id, db_user.username)
+    return db_user
+
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_users_bulk(users: List[schemas.UserImport], db: database.AnySession = Depends(database.get_db)):
+    bulk.check_size(users)
+    return await database.run(db, bulk.import_users, users, config.BULK_CHUNK_SIZE)
+
+
+@router.get("/{user_id}/discussions", response_model=schemas.DiscussionPage)
+async def list_user_discussions(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_deleted: bool = False,
+    db: database.AnySession = Depends(database.get_read_db)
+):
+    return await _activity(db, models.Discussion, user_id, cursor, limit, include_deleted)
+
+
+@router.get("/{user_id}/comments", response_model=schemas.CommentPage)
+async def list_user_comments(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_deleted: bool = False,
+    db: database.AnySession = Depends(database.get_read_db)
+):
+    return await _activity(db, models.Comment, user_id, cursor, limit, include_deleted)
+
+
+async def _activity(db, model, user_id: int, cursor: Optional[str], limit: int, include_deleted: bool):
+    if not sharding.enabled():
+        return await database.run(db, _user_activity, model, user_id, cursor, limit, include_deleted)
+    pages = await sharding.gather(_user_activity, model, user_id, cursor, limit, include_deleted)
+    items, next_cursor = sharding.merge_pages(
+        [(page["items"], page["next_cursor"]) for page in pages], model.created_at, limit,
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _user_activity(db: Session, model, user_id: int, cursor: Optional[str], limit: int, include_deleted: bool):
+    """A page of the user's discussions or comments, newest first.
+
+    Served by the ``(author_id, created_at, id)`` index, so a page costs the
+    same for a user with a handful of posts or hundreds of thousands.
+    """
+    if not usernames.exists(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    query = db.query(model).filter(model.author_id == user_id)
+    if not include_deleted:
+        query = query.filter(model.deleted.is_not(True))
+    items, next_cursor = paginate(query, model.created_at, model.id, cursor, limit, descending=True)
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -23,6 +23,9 @@ class DiscussionOut(BaseModel):
     created_at: datetime
     deleted: Optional[bool] = False
     deleted_at: Optional[datetime] = None
+    version: int = 1
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
     class Config:
         orm_mode = True
 
@@ -40,4 +43,80 @@ class CommentOut(BaseModel):
     deleted: Optional[bool] = False
     deleted_at: Optional[datetime] = None
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class DiscussionPage(BaseModel):
+    items: List[DiscussionOut]
+    next_cursor: Optional[str] = None
+    # Author id -> username, with ?with_authors=true
+    authors: Optional[Dict[int, str]] = None
+
+class CommentPage(BaseModel):
+    items: List[CommentOut]
+    next_cursor: Optional[str] = None
+    # Author id -> username, with ?with_authors=true
+    authors: Optional[Dict[int, str]] = None
+
+
+class CommentNode(CommentOut):
+    depth: int
+    reply_count: int = 0
+    more_replies: int = 0
+    replies: List["CommentNode"] = []
+
+CommentNode.update_forward_refs()
+
+class CommentTree(BaseModel):
+    discussion_id: int
+    items: List[CommentNode]
+    more_replies: int = 0
+    authors: Optional[Dict[int, str]] = None
+
+class SearchHit(BaseModel):
+    type: str
+    id: int
+    discussion_id: int
+    snippet: str
+    score: float
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    next_cursor: Optional[str] = None
+
+class UserImport(UserCreate):
+    id: Optional[int] = None
+
+class DiscussionImport(DiscussionCreate):
+    id: Optional[int] = None
+    author_id: int
+    created_at: Optional[datetime] = None
+
+class CommentImport(CommentCreate):
+    id: Optional[int] = None
+    discussion_id: int
+    author_id: int
+    created_at: Optional[datetime] = None
+
+class BulkError(BaseModel):
+    index: int
+    detail: str
+
+class BulkResult(BaseModel):
+    created: int
+    ids: List[Optional[int]]
+    errors: List[BulkError]
+
+class Change(BaseModel):
+    seq: int
+    type: str
+    id: int
+    discussion_id: int
+    # The row no longer exists (hard deleted or archived); soft deletes come with the row.
+    removed: bool = False
+    discussion: Optional[DiscussionOut] = None
+    comment: Optional[CommentOut] = None
+
+class ChangePage(BaseModel):
+    items: List[Change]
+    next_cursor: str
+    has_more: bool = False
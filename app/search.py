@@ -0,0 +1,135 @@
+"""Full-text search over discussions and comments with SQLite FTS5.
+
+``discussions_fts`` and ``comments_fts`` hold the text of live rows only.
+Triggers keep them in sync with every insert, edit and soft delete, whether
+it comes from the routes or a bulk import. They are created alongside the
+tables and can be rebuilt from scratch with ``python -m app.cli rebuild-search``.
+"""
+from fastapi import HTTPException
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from . import models
+from .pagination import decode_cursor, encode_cursor
+
+
+DISCUSSIONS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS discussions_fts USING fts5(title, body, tokenize='unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS discussions_fts_insert AFTER INSERT ON discussions
+    WHEN NOT coalesce(new.deleted, 0) BEGIN
+        INSERT INTO discussions_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS discussions_fts_update AFTER UPDATE OF title, body, deleted ON discussions
+    BEGIN
+        DELETE FROM discussions_fts WHERE rowid = old.id;
+        INSERT INTO discussions_fts(rowid, title, body)
+            SELECT new.id, new.title, new.body WHERE NOT coalesce(new.deleted, 0);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS discussions_fts_delete AFTER DELETE ON discussions
+    BEGIN
+        DELETE FROM discussions_fts WHERE rowid = old.id;
+    END""",
+]
+
+COMMENTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(body, tokenize='unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments
+    WHEN NOT coalesce(new.deleted, 0) BEGIN
+        INSERT INTO comments_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_update AFTER UPDATE OF body, deleted ON comments
+    BEGIN
+        DELETE FROM comments_fts WHERE rowid = old.id;
+        INSERT INTO comments_fts(rowid, body)
+            SELECT new.id, new.body WHERE NOT coalesce(new.deleted, 0);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments
+    BEGIN
+        DELETE FROM comments_fts WHERE rowid = old.id;
+    END""",
+]
+
+for table, statements in ((models.Discussion.__table__, DISCUSSIONS_DDL), (models.Comment.__table__, COMMENTS_DDL)):
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(models.Discussion.__table__, "before_drop", DDL("DROP TABLE IF EXISTS discussions_fts").execute_if(dialect="sqlite"))
+event.listen(models.Comment.__table__, "before_drop", DDL("DROP TABLE IF EXISTS comments_fts").execute_if(dialect="sqlite"))
+
+
+# Title matches weigh more than body matches.
+DISCUSSION_QUERY = """
+    SELECT 'discussion' AS type, f.rowid AS id, f.rowid AS discussion_id,
+           snippet(discussions_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+           bm25(discussions_fts, 4.0, 1.0) AS score
+    FROM discussions_fts AS f
+    WHERE discussions_fts MATCH :query {after}
+    ORDER BY score, f.rowid
+    LIMIT :limit
+"""
+
+COMMENT_QUERY = """
+    SELECT 'comment' AS type, f.rowid AS id, c.discussion_id AS discussion_id,
+           snippet(comments_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet,
+           bm25(comments_fts) AS score
+    FROM comments_fts AS f
+    JOIN comments AS c ON c.id = f.rowid
+    JOIN discussions AS d ON d.id = c.discussion_id AND NOT coalesce(d.deleted, 0)
+    WHERE comments_fts MATCH :query {after}
+    ORDER BY score, f.rowid
+    LIMIT :limit
+"""
+
+
+def to_match_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, ``word*`` is a prefix.
+
+    Words are quoted so FTS5 operators and punctuation in user input are
+    matched literally instead of raising a syntax error.
+    """
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+def search(db: Session, q: str, type: str, cursor: Optional[str], limit: int):
+    """Return a page of ranked hits, best first, and the cursor of the next page."""
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Search requires SQLite FTS5")
+    query = to_match_query(q)
+    if not query:
+        return {"items": [], "next_cursor": None}
+
+    params = {"query": query, "limit": limit + 1}
+    after = ""
+    position = decode_cursor(cursor)
+    if position is not None:
+        params["after_score"], params["after_id"] = position
+        after = "AND (score, f.rowid) > (:after_score, :after_id)"
+    sql = DISCUSSION_QUERY if type == "discussions" else COMMENT_QUERY
+    rows: List = db.execute(text(sql.format(after=after)), params).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["score"], rows[-1]["id"])
+    return {"items": [dict(row) for row in rows], "next_cursor": next_cursor}
+
+
+def rebuild(db: Session) -> int:
+    """Re-index every live discussion and comment. Returns the number of rows indexed."""
+    db.execute(text("DELETE FROM discussions_fts"))
+    db.execute(text("DELETE FROM comments_fts"))
+    indexed = db.execute(text(
+        "INSERT INTO discussions_fts(rowid, title, body) "
+        "SELECT id, title, body FROM discussions WHERE NOT coalesce(deleted, 0)"
+    )).rowcount
+    indexed += db.execute(text(
+        "INSERT INTO comments_fts(rowid, body) "
+        "SELECT id, body FROM comments WHERE NOT coalesce(deleted, 0)"
+    )).rowcount
+    db.commit()
+    return indexed
@@ -0,0 +1,196 @@
+"""Optional sharded storage: discussions and comments spread over N SQLite files.
+
+With ``SHARD_URLS`` set, ``DATABASE_URL`` is the global database, holding
+the users and the id allocator. Each discussion lives in shard
+``discussion_id % N`` together with its comments and everything derived from
+them (search index, change log, archive). Every shard has its own writer
+connection, so writes to different shards no longer wait for each other.
+
+Ids come from the global database in blocks of ``ID_BLOCK_SIZE`` and are
+unique across shards. Discussion ids are dealt out in order, which spreads
+new discussions round-robin over the shards. A comment gets ``n * N + shard``,
+so ``comment_id % N`` finds its shard as well. N cannot change once data
+has been written.
+
+Routes get a session bound to their shard, with ``User`` bound to the global
+database, so their code is the same in both modes. Listings over every shard
+are a k-way merge of one keyset page per shard (``merge_pages``). Search,
+the change feed, the whole-forum export and the bulk imports rely on a single
+database's order and answer 501.
+"""
+import asyncio
+import heapq
+import threading
+from contextlib import contextmanager
+from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from itertools import islice
+from sqlalchemy import event, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Callable, Dict, Generator, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from . import config, database, migrate, models
+from .pagination import encode_cursor
+
+T = TypeVar("T")
+
+
+class IdAllocator:
+    """Hands out ids from the named sequences of the global database, a block at a time."""
+
+    def __init__(self, engine: Engine, block_size: int):
+        self.engine = engine
+        self.block_size = block_size
+        self._blocks: Dict[str, List[int]] = {}  # name -> [next id, end of block)
+        self._lock = threading.Lock()
+
+    def next(self, name: str) -> int:
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[name] = self._reserve(name)
+            id = block[0]
+            block[0] += 1
+            return id
+
+    def _reserve(self, name: str) -> List[int]:
+        sequences = models.IdSequence.__table__
+        with self.engine.begin() as conn:
+            end = conn.execute(
+                update(sequences)
+                .where(sequences.c.name == name)
+                .values(next_id=sequences.c.next_id + self.block_size)
+                .returning(sequences.c.next_id)
+            ).scalar_one()
+        return [end - self.block_size, end]
+
+
+class Shards:
+    def __init__(self, urls: Sequence[str], global_engine: Engine, global_read_engine: Engine, block_size: int):
+        self.engines = [database.make_engines(url) for url in urls]
+        # Shard sessions only read users, so they take a reader connection
+        # and never queue behind the global writer.
+        self.global_read_engine = global_read_engine
+        self.ids = IdAllocator(global_engine, block_size)
+        self._sessions = sessionmaker()
+        event.listen(self._sessions, "before_flush", self._assign_comment_ids)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def index(self, id: int) -> int:
+        """The shard of a discussion id, or of a comment id."""
+        return id % len(self.engines)
+
+    def session(self, index: int, readonly: bool = False) -> Session:
+        writer, reader = self.engines[index]
+        db = self._sessions(bind=reader if readonly else writer, binds={models.User: self.global_read_engine})
+        db.info["shard"] = index
+        return db
+
+    def _assign_comment_ids(self, db: Session, flush_context, instances) -> None:
+        for obj in db.new:
+            if isinstance(obj, models.Comment) and obj.id is None:
+                obj.id = self.ids.next("comments") * len(self.engines) + db.info["shard"]
+
+
+def _open() -> Optional[Shards]:
+    urls = [url.strip() for url in config.SHARD_URLS.split(",") if url.strip()]
+    if not urls:
+        return None
+    return Shards(urls, database.engine, database.read_engine, config.ID_BLOCK_SIZE)
+
+
+shards = _open()
+
+
+def enabled() -> bool:
+    return shards is not None
+
+
+def check() -> None:
+    """Refuse to start unless every shard is at the head revision, like the global database."""
+    for writer, _ in shards.engines if shards else ():
+        migrate.check(writer)
+
+
+def upgrade() -> int:
+    for writer, _ in shards.engines if shards else ():
+        migrate.upgrade(writer)
+    return len(shards) if shards else 0
+
+
+@contextmanager
+def sessions() -> Iterator[List[Session]]:
+    """A writer session on every shard, or on the only database when not sharded."""
+    dbs = [shards.session(i) for i in range(len(shards))] if shards else [database.SessionLocal()]
+    try:
+        yield dbs
+    finally:
+        for db in dbs:
+            db.close()
+
+
+def _shard_session(index: int, readonly: bool) -> Generator[Session, None, None]:
+    db = shards.session(index, readonly)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Route dependencies: the shard of the id in the path, or get_db / get_read_db when not sharded.
+
+def get_discussion_db(discussion_id: int, db: database.AnySession = Depends(database.get_db)):
+    if shards is None:
+        yield db
+    else:
+        yield from _shard_session(shards.index(discussion_id), readonly=False)
+
+
+def get_discussion_read_db(discussion_id: int, db: database.AnySession = Depends(database.get_read_db)):
+    if shards is None:
+        yield db
+    else:
+        yield from _shard_session(shards.index(discussion_id), readonly=True)
+
+
+def get_comment_db(comment_id: int, db: database.AnySession = Depends(database.get_db)):
+    if shards is None:
+        yield db
+    else:
+        yield from _shard_session(shards.index(comment_id), readonly=False)
+
+
+def require_unsharded() -> None:
+    if shards is not None:
+        raise HTTPException(status_code=501, detail="Not available with sharded storage")
+
+
+async def run_on(index: int, fn: Callable[..., T], *args, readonly: bool = False) -> T:
+    """Call ``fn(session, *args)`` on shard ``index`` in the threadpool."""
+    def call():
+        with shards.session(index, readonly) as db:
+            return fn(db, *args)
+    return await run_in_threadpool(call)
+
+
+async def gather(fn: Callable[..., T], *args, readonly: bool = True) -> List[T]:
+    """Call ``fn(session, *args)`` on every shard concurrently; results in shard order."""
+    return list(await asyncio.gather(*(run_on(i, fn, *args, readonly=readonly) for i in range(len(shards)))))
+
+
+def merge_pages(pages: Sequence[Tuple[list, Optional[str]]], key_col, limit: int, descending: bool = True):
+    """Merge one keyset page per shard into the global page and its cursor.
+
+    Each shard's page is already in ``(key_col, id)`` order and ids are
+    unique across shards, so a k-way merge of the first ``limit`` rows is
+    the page a single database would have returned. Another page exists if
+    rows were left over or any shard has more.
+    """
+    key = lambda row: (getattr(row, key_col.key), row.id)
+    merged = list(islice(heapq.merge(*(rows for rows, _ in pages), key=key, reverse=descending), limit + 1))
+    more = len(merged) > limit or any(cursor for _, cursor in pages)
+    rows = merged[:limit]
+    next_cursor = encode_cursor(*key(rows[-1])) if more and rows else None
+    return rows, next_cursor
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Bundle, Session, aliased
+from typing import Dict, List, Optional, Tuple
+from . import models
+
+
+COMMENT_FIELDS = ("id", "body", "author_id", "discussion_id", "parent_id", "created_at", "deleted", "deleted_at")
+
+
+def fetch_thread(db: Session, discussion_id: int, max_depth: int, fields_only: bool = False) -> List[Tuple[models.Comment, int, int]]:
+    """Load a discussion's comments down to ``max_depth`` in a single round-trip.
+
+    A recursive CTE walks from the top-level comments through ``parent_id``
+    and stops descending at ``max_depth``. Each row comes back with its depth
+    and its total number of direct replies, so the caller can report how many
+    replies were cut off without issuing follow-up queries. With
+    ``fields_only`` the comment is a row of ``COMMENT_FIELDS`` instead of a
+    loaded ``Comment``.
+    """
+    Comment = models.Comment
+    child = aliased(Comment)
+    replies = aliased(Comment)
+
+    thread = (
+        select(Comment.id.label("id"), literal(0).label("depth"))
+        .where(Comment.discussion_id == discussion_id, Comment.parent_id.is_(None))
+        .cte("thread", recursive=True)
+    )
+    thread = thread.union_all(
+        select(child.id, thread.c.depth + 1)
+        .join(thread, child.parent_id == thread.c.id)
+        .where(child.discussion_id == discussion_id, thread.c.depth < max_depth)
+    )
+    reply_count = (
+        select(func.count(replies.id))
+        .where(replies.parent_id == Comment.id, replies.discussion_id == Comment.discussion_id)
+        .correlate(Comment)
+        .scalar_subquery()
+    )
+    comment = Bundle("comment", *(getattr(Comment, f) for f in COMMENT_FIELDS)) if fields_only else Comment
+    return (
+        db.query(comment, thread.c.depth, reply_count)
+        .join(thread, Comment.id == thread.c.id)
+        .order_by(Comment.created_at, Comment.id)
+        .all()
+    )
+
+
+def build_tree(rows, max_children: Optional[int] = None) -> Tuple[List[dict], int]:
+    """Nest ``fetch_thread`` rows in O(n), keeping at most ``max_children`` per node.
+
+    Returns the top-level nodes and the number of top-level comments that were
+    left out. Every node carries ``more_replies``, the count of direct replies
+    that are not included below it (cut by ``max_children`` or by depth).
+    """
+    children: Dict[Optional[int], List[dict]] = defaultdict(list)
+    for comment, depth, reply_count in rows:
+        node = {field: getattr(comment, field) for field in COMMENT_FIELDS}
+        node.update(depth=depth, reply_count=reply_count, more_replies=reply_count, replies=[])
+        children[comment.parent_id if depth > 0 else None].append(node)
+
+    roots = children.get(None, [])
+    top_level = roots if max_children is None else roots[:max_children]
+    stack = list(top_level)
+    while stack:
+        node = stack.pop()
+        kids = children.get(node["id"], [])
+        node["replies"] = kids if max_children is None else kids[:max_children]
+        node["more_replies"] = node["reply_count"] - len(node["replies"])
+        stack.extend(node["replies"])
+    return top_level, len(roots) - len(top_level)
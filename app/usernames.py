@@ -0,0 +1,52 @@
+"""In-process cache of usernames by user id.
+
+Write paths check that the author exists through it instead of loading the
+``User`` row on every request, and listing and thread pages can embed their
+authors' usernames (``?with_authors=true``). Lookups take a whole set of ids
+and load every miss with one query. Users are only ever created, so entries
+cannot go stale through the API; new users are added as they are written
+and ``USER_CACHE_TTL`` bounds how long a change made behind the app's back
+is served.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable
+from . import cache, config, models
+
+names = cache.LRUCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+
+
+def lookup(db: Session, user_ids: Iterable[int]) -> Dict[int, str]:
+    """Usernames of ``user_ids``; ids of users that do not exist are left out."""
+    found: Dict[int, str] = {}
+    missing = set()
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        username = names.get(user_id)
+        if username is None:
+            missing.add(user_id)
+        else:
+            found[user_id] = username
+    if missing:
+        generation = names.generation()
+        rows = db.execute(select(models.User.id, models.User.username).where(models.User.id.in_(missing))).all()
+        for user_id, username in rows:
+            names.set(user_id, username, generation=generation)
+            found[user_id] = username
+    return found
+
+
+def exists(db: Session, user_id: int) -> bool:
+    return user_id in lookup(db, (user_id,))
+
+
+def remember(user_id: int, username: str) -> None:
+    """Add a user that was just written."""
+    names.set(user_id, username)
+
+
+def of_authors(db: Session, items: Iterable) -> Dict[str, str]:
+    """The ``authors`` map of a page: user id (as a JSON key) to username, for ORM rows or dicts."""
+    ids = (item["author_id"] if isinstance(item, dict) else item.author_id for item in items)
+    return {str(user_id): username for user_id, username in lookup(db, ids).items()}
@@ -0,0 +1,48 @@
+import hashlib
+from fastapi import Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional, Tuple
+from . import models
+
+
+def bump(db: Session, discussion_id: int, **values) -> None:
+    """Increment the discussion's version in the caller's transaction.
+
+    Extra ``values`` are applied by the same UPDATE, e.g. comment counters.
+    """
+    db.execute(
+        update(models.Discussion)
+        .where(models.Discussion.id == discussion_id)
+        .values(version=models.Discussion.version + 1, **values)
+    )
+
+
+def current(db: Session, discussion_id: int) -> Optional[int]:
+    return db.query(models.Discussion.version).filter_by(id=discussion_id).scalar()
+
+
+def thread_etag(discussion_id: int, version: int) -> str:
+    return f'W/"t{discussion_id}.{version}"'
+
+
+def page_etag(keys: Iterable[Tuple[int, int]], next_cursor: Optional[str]) -> str:
+    """ETag of a listing page from the ``(id, version)`` pairs it is made of."""
+    digest = hashlib.blake2b(digest_size=12)
+    for id, version in keys:
+        digest.update(f"{id}.{version};".encode())
+    digest.update((next_cursor or "").encode())
+    return f'W/"p{digest.hexdigest()}"'
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    strip = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    return "*" in candidates or strip(etag) in {strip(tag) for tag in candidates}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,146 @@
+"""Deterministic synthetic forum: users, discussions and deep comment trees.
+
+    python -m benchmarks.dataset --database forum.db --comments 1000000
+
+The same ``--seed`` and sizes always produce the same rows. Comments are
+spread over discussions with a long tail (a few huge threads, many small
+ones) and most of them are replies, often to recent comments, so trees get
+deep. Discussion stats (``comment_count``, ``last_activity_at``,
+``hot_score``) are written consistent with the generated comments. Rows go
+in with executemany batches, so 10M comments only need memory for one batch
+and one discussion.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from typing import List, Optional
+from app import migrate, models, ranking
+from app.database import make_engines
+
+# Timestamps are anchored here instead of at utcnow() so runs are reproducible.
+EPOCH = datetime(2024, 1, 1)
+
+
+def thread_sizes(rng: random.Random, discussions: int, comments: int) -> List[int]:
+    """Split ``comments`` over ``discussions`` following a Pareto distribution."""
+    weights = [rng.paretovariate(1.16) for _ in range(discussions)]
+    total = sum(weights)
+    sizes = [int(comments * w / total) for w in weights]
+    for i in range(comments - sum(sizes)):
+        sizes[i % discussions] += 1
+    return sizes
+
+
+def build(
+    engine: Engine,
+    comments: int = 10_000,
+    discussions: Optional[int] = None,
+    users: Optional[int] = None,
+    seed: int = 0,
+    max_depth: int = 24,
+    reply_ratio: float = 0.8,
+    days: int = 30,
+    batch_size: int = 10_000,
+) -> dict:
+    """Migrate ``engine``'s database to the current schema and fill it. Returns the dataset's sizes."""
+    discussions = discussions or max(comments // 50, 1)
+    users = users or max(comments // 20, 1)
+    rng = random.Random(seed)
+    migrate.upgrade(engine)
+    end = EPOCH + timedelta(days=days)
+
+    with engine.begin() as conn:
+        for offset in range(0, users, batch_size):
+            conn.execute(insert(models.User), [
+                {"id": i, "username": f"user{i}"} for i in range(offset + 1, min(offset + batch_size, users) + 1)
+            ])
+
+    discussion_rows, comment_rows = [], []
+
+    def flush():
+        with engine.begin() as conn:
+            if discussion_rows:
+                conn.execute(insert(models.Discussion), discussion_rows)
+            if comment_rows:
+                conn.execute(insert(models.Comment), comment_rows)
+        discussion_rows.clear()
+        comment_rows.clear()
+
+    comment_id = 0
+    for discussion_id, size in enumerate(thread_sizes(rng, discussions, comments), start=1):
+        created_at = EPOCH + timedelta(seconds=rng.uniform(0, days * 86400))
+        # Replies arrive with exponential gaps that stretch over the thread's life.
+        mean_gap = max((end - created_at).total_seconds(), 1) / (size + 1)
+        at = created_at
+        depths: List[int] = []
+        for n in range(size):
+            comment_id += 1
+            at += timedelta(seconds=rng.expovariate(1 / mean_gap))
+            parent_id = None
+            depth = 0
+            if n and rng.random() < reply_ratio:
+                # Replies favour the newest comments, which is what makes chains deep.
+                parent = n - 1 - min(int(rng.expovariate(0.5)), n - 1)
+                if depths[parent] + 1 < max_depth:
+                    parent_id = comment_id - n + parent
+                    depth = depths[parent] + 1
+            depths.append(depth)
+            comment_rows.append({
+                "id": comment_id,
+                "body": f"Comment {comment_id} in discussion {discussion_id}",
+                "author_id": rng.randint(1, users),
+                "discussion_id": discussion_id,
+                "parent_id": parent_id,
+                "created_at": at,
+            })
+            if len(comment_rows) >= batch_size:
+                flush()
+        discussion_rows.append({
+            "id": discussion_id,
+            "title": f"Discussion {discussion_id}",
+            "body": f"Opening post of discussion {discussion_id}",
+            "author_id": rng.randint(1, users),
+            "created_at": created_at,
+            "comment_count": size,
+            "last_activity_at": at,
+            "hot_score": ranking.hot_score(size, created_at, end),
+        })
+        if len(discussion_rows) >= batch_size:
+            flush()
+    flush()
+    return {"users": users, "discussions": discussions, "comments": comments, "seed": seed}
+
+
+def describe(engine: Engine) -> dict:
+    """Sizes of an existing dataset, so a database can be reused across runs."""
+    with engine.connect() as conn:
+        return {
+            "users": conn.scalar(select(func.count()).select_from(models.User)),
+            "discussions": conn.scalar(select(func.count()).select_from(models.Discussion)),
+            "comments": conn.scalar(select(func.count()).select_from(models.Comment)),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True, help="SQLite file to create")
+    parser.add_argument("--comments", type=int, default=10_000)
+    parser.add_argument("--discussions", type=int, help="default: comments / 50")
+    parser.add_argument("--users", type=int, help="default: comments / 20")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-depth", type=int, default=24)
+    args = parser.parse_args()
+
+    engine, _ = make_engines(f"sqlite:///{args.database}")
+    started = time.perf_counter()
+    summary = build(engine, args.comments, args.discussions, args.users, args.seed, args.max_depth)
+    summary["seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
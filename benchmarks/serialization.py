@@ -0,0 +1,78 @@
+"""Per-row cost of rendering pages with pydantic ORM validation vs the orjson fast path.
+
+    python -m benchmarks.serialization --comments 5000 --repeat 20
+
+Each case runs the route's query and renders the body exactly as the route
+does, once with ``FAST_JSON`` off and once on. Results are microseconds per
+rendered row, printed as JSON.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from sqlalchemy.orm import sessionmaker
+from app import cache, config, schemas, threads
+from app.database import make_engines
+from app.models import Discussion
+from app.routes.comments import _get_comments
+from app.routes.discussions import _list_discussions
+from . import dataset
+
+
+def _discussion_page(db, limit):
+    return schemas.DiscussionPage, lambda: _list_discussions(db, list(range(1, limit + 1)), None), limit
+
+
+def _comment_page(db, discussion_id, limit):
+    return schemas.CommentPage, lambda: _get_comments(db, discussion_id, None, limit), limit
+
+
+def _tree(db, discussion_id, comments):
+    def compute():
+        items, more_replies = threads.build_tree(threads.fetch_thread(db, discussion_id, 64, config.FAST_JSON))
+        return {"discussion_id": discussion_id, "items": items, "more_replies": more_replies}
+    return schemas.CommentTree, compute, comments
+
+
+def measure(model, compute, rows: int, repeat: int) -> float:
+    cache.render(model, compute())  # warm up statement and schema caches
+    started = time.perf_counter()
+    for _ in range(repeat):
+        cache.render(model, compute())
+    return (time.perf_counter() - started) / repeat / rows * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments", type=int, default=5000, help="comments spread over 200 discussions")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, _ = make_engines(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        dataset.build(engine, comments=args.comments, discussions=200)
+        Session = sessionmaker(bind=engine)
+        results = {}
+        with Session() as db:
+            # The long tail of thread sizes guarantees one thread far bigger than a page.
+            biggest = db.query(Discussion.id, Discussion.comment_count).order_by(Discussion.comment_count.desc()).first()
+            cases = {
+                "discussion_page_200": _discussion_page(db, 200),
+                "comment_page_50": _comment_page(db, biggest.id, 50),
+                "comment_page_200": _comment_page(db, biggest.id, 200),
+                "thread_tree": _tree(db, biggest.id, biggest.comment_count),
+            }
+            for name, (model, compute, rows) in cases.items():
+                timings = {}
+                for fast in (False, True):
+                    config.FAST_JSON = fast
+                    timings["fast" if fast else "pydantic"] = round(measure(model, compute, rows, args.repeat), 2)
+                timings["speedup"] = round(timings["pydantic"] / timings["fast"], 2)
+                results[name] = {"rows": rows, "us_per_row": timings}
+        engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
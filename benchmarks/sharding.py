@@ -0,0 +1,135 @@
+"""Comment write throughput on one SQLite database vs 2..N shards.
+
+    python -m benchmarks.sharding --seconds 5 --writers 8 --shards 1,2,4 --synchronous FULL
+
+Writer threads create comments through the route's own write path
+(``routes.comments._create_comment``: author check, insert, stats update,
+commit) on discussions spread evenly over the shards. "single" is the
+unsharded app: every write goes through the one writer connection of
+``DATABASE_URL``. With N shards each has its own writer connection, so
+writes to different shards no longer queue behind each other.
+
+For each setup the writes per second, the latency percentiles and the time a
+write spent waiting for its writer connection are printed as JSON. The wait
+is what sharding removes; whether that turns into more writes per second
+depends on where a write spends its time. With ``--synchronous FULL`` every
+commit waits for an fsync, which several shards can overlap; with ``NORMAL``
+(the app's default, in WAL mode) a commit does not sync and the write is
+CPU-bound in Python, so only more cores help.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+from app import config, migrate, models, schemas, usernames
+from app.database import make_engines
+from app.routes.comments import _create_comment
+from app.sharding import Shards
+from benchmarks.workload import percentile
+
+USERS = 100
+
+
+def _seed_users(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": i, "username": f"writer{i}"} for i in range(1, USERS + 1)])
+
+
+def _seed_discussions(session: Callable[[int], Session], ids: List[int]) -> None:
+    for id in ids:
+        with session(id) as db:
+            db.add(models.Discussion(id=id, title=f"Discussion {id}", body="seed", author_id=1))
+            db.commit()
+
+
+def _writer(session, discussions: List[int], offset: int, stop: threading.Event, samples: Dict[str, list]) -> None:
+    i = offset
+    while not stop.is_set():
+        i += 1
+        discussion_id = discussions[i % len(discussions)]
+        started = time.perf_counter()
+        with session(discussion_id) as db:
+            db.connection()  # the writer connection: the wait sharding removes
+            acquired = time.perf_counter()
+            _create_comment(db, discussion_id, schemas.CommentCreate(body="bench write"), i % USERS + 1)
+        done = time.perf_counter()
+        samples["wait"].append(acquired - started)
+        samples["latency"].append(done - started)
+
+
+def run(shard_count: int, args) -> dict:
+    """Write for ``args.seconds``; ``shard_count`` 0 is the unsharded setup."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = lambda name: f"sqlite:///{os.path.join(tmp, name)}.db"
+        global_writer, global_reader = make_engines(url("global"))
+        migrate.upgrade(global_writer)
+        _seed_users(global_writer)
+        engines = [(global_writer, global_reader)]
+
+        if shard_count:
+            shards = Shards([url(f"shard{i}") for i in range(shard_count)], global_writer, global_reader, 1000)
+            engines += shards.engines
+            for writer, _ in shards.engines:
+                migrate.upgrade(writer)
+            session = lambda discussion_id: shards.session(shards.index(discussion_id))
+            discussions = [shards.ids.next("discussions") for _ in range(args.discussions)]
+        else:
+            Single = sessionmaker(bind=global_writer)
+            session = lambda discussion_id: Single()
+            discussions = list(range(1, args.discussions + 1))
+        _seed_discussions(session, discussions)
+        usernames.names.clear()
+
+        stop = threading.Event()
+        samples = [{"wait": [], "latency": []} for _ in range(args.writers)]
+        threads = [
+            threading.Thread(target=_writer, args=(session, discussions, i, stop, samples[i]))
+            for i in range(args.writers)
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        for writer, reader in engines:
+            writer.dispose()
+            reader.dispose()
+
+    latency = sorted(s for sample in samples for s in sample["latency"])
+    wait = [s for sample in samples for s in sample["wait"]]
+    return {
+        "writes_per_s": round(len(latency) / elapsed, 1),
+        "mean_ms": round(sum(latency) / max(len(latency), 1) * 1000, 2),
+        "p50_ms": round(percentile(latency, 50) * 1000, 2),
+        "p95_ms": round(percentile(latency, 95) * 1000, 2),
+        "mean_wait_ms": round(sum(wait) / max(len(wait), 1) * 1000, 2),
+        "wait_share": round(sum(wait) / max(sum(latency), 1e-9), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--discussions", type=int, default=64, help="spread evenly over the shards")
+    parser.add_argument("--shards", default="1,2,4", help="comma-separated shard counts to compare")
+    parser.add_argument("--synchronous", default=config.SQLITE_SYNCHRONOUS, help="SQLite synchronous pragma")
+    args = parser.parse_args()
+    config.SQLITE_SYNCHRONOUS = args.synchronous
+
+    results = {"single": run(0, args)}
+    for count in (int(n) for n in args.shards.split(",")):
+        results[f"{count}_shards"] = run(count, args)
+    print(json.dumps({"cpus": os.cpu_count(), "synchronous": args.synchronous, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Concurrent read/write throughput of the default SQLite setup vs the tuned one.
+
+    python -m benchmarks.sqlite_tuning --seconds 5 --readers 8 --writers 2
+
+"baseline" is a single engine with SQLite defaults (rollback journal, shared
+pool); "tuned" is what app.database builds: WAL, pragmas, a pooled read-only
+engine and one serialized writer connection. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import Base, make_engines
+from app.pagination import paginate
+
+
+def _seed(session_factory, discussions: int, comments: int) -> None:
+    with session_factory() as db:
+        user = models.User(username="bench")
+        db.add(user)
+        db.flush()
+        for d in range(discussions):
+            disc = models.Discussion(title=f"Discussion {d}", body="seed", author_id=user.id)
+            db.add(disc)
+            db.flush()
+            db.add_all(
+                models.Comment(body=f"comment {c}", author_id=user.id, discussion_id=disc.id)
+                for c in range(comments)
+            )
+        db.commit()
+
+
+def _reader(session_factory, discussions: int, stop: threading.Event, counts: dict) -> None:
+    i = 0
+    while not stop.is_set():
+        i += 1
+        try:
+            with session_factory() as db:
+                paginate(
+                    db.query(models.Comment).filter_by(discussion_id=i % discussions + 1),
+                    models.Comment.created_at,
+                    models.Comment.id,
+                    None,
+                    50,
+                )
+            counts["reads"] += 1
+        except OperationalError:
+            counts["errors"] += 1
+
+
+def _writer(session_factory, discussions: int, stop: threading.Event, counts: dict) -> None:
+    i = 0
+    while not stop.is_set():
+        i += 1
+        try:
+            with session_factory() as db:
+                db.add(models.Comment(body="bench write", author_id=1, discussion_id=i % discussions + 1))
+                db.commit()
+            counts["writes"] += 1
+        except OperationalError:
+            counts["errors"] += 1
+
+
+def run(tuned: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        writer, reader = make_engines(url, pragmas=tuned, split=tuned)
+        Base.metadata.create_all(bind=writer)
+        WriteSession = sessionmaker(bind=writer)
+        ReadSession = sessionmaker(bind=reader)
+        _seed(WriteSession, args.discussions, args.comments)
+
+        stop = threading.Event()
+        counts = [{"reads": 0, "writes": 0, "errors": 0} for _ in range(args.readers + args.writers)]
+        threads = [
+            threading.Thread(target=_reader, args=(ReadSession, args.discussions, stop, counts[i]))
+            for i in range(args.readers)
+        ] + [
+            threading.Thread(target=_writer, args=(WriteSession, args.discussions, stop, counts[args.readers + i]))
+            for i in range(args.writers)
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        writer.dispose()
+        reader.dispose()
+
+    totals = {key: sum(c[key] for c in counts) for key in ("reads", "writes", "errors")}
+    return {
+        "reads_per_s": round(totals["reads"] / elapsed, 1),
+        "writes_per_s": round(totals["writes"] / elapsed, 1),
+        "errors": totals["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--discussions", type=int, default=50)
+    parser.add_argument("--comments", type=int, default=200, help="seeded comments per discussion")
+    args = parser.parse_args()
+
+    results = {"baseline": run(False, args), "tuned": run(True, args)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Mixed read/write load against the real routes, served in-process.
+
+    python -m benchmarks.workload --comments 100000 --workload mixed --seconds 10 --concurrency 16
+
+A synthetic forum (see benchmarks.dataset) is generated into ``--database``,
+or reused if the file already exists, and the app is pointed at it through
+``DATABASE_URL``. Workers send requests through httpx's ASGI transport, so
+the full stack (routing, validation, cache, sessions, SQLite) is measured
+without a network in between. Latency percentiles and request rates, overall
+and per operation, are printed as JSON so runs can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+# name -> relative weight of each operation
+WORKLOADS = {
+    "read-heavy": {"list": 30, "list_hot": 10, "thread": 35, "tree": 20, "create_comment": 4, "edit_comment": 1},
+    "mixed": {
+        "list": 20, "list_hot": 10, "thread": 25, "tree": 15,
+        "create_comment": 15, "edit_comment": 5, "delete_comment": 5, "create_discussion": 5,
+    },
+    "write-heavy": {
+        "list": 10, "thread": 15, "tree": 5,
+        "create_comment": 40, "edit_comment": 10, "delete_comment": 10, "create_discussion": 10,
+    },
+}
+
+
+class State:
+    """What workers know about the forum: its sizes and the comments they wrote."""
+
+    def __init__(self, dataset: dict):
+        self.users = dataset["users"]
+        self.discussions = dataset["discussions"]
+        self.written: List[tuple] = []  # (comment id, author id)
+
+    def discussion(self, rng: random.Random) -> int:
+        # Traffic is skewed: a small set of discussions gets most of the reads.
+        return int(self.discussions * rng.random() ** 3) + 1
+
+    def user(self, rng: random.Random) -> int:
+        return rng.randint(1, self.users)
+
+
+async def list_discussions(client, state, rng):
+    return await client.get("/discussions/")
+
+
+async def list_hot(client, state, rng):
+    return await client.get("/discussions/", params={"sort": "hot"})
+
+
+async def thread(client, state, rng):
+    return await client.get(f"/comments/discussion/{state.discussion(rng)}")
+
+
+async def tree(client, state, rng):
+    return await client.get(f"/comments/discussion/{state.discussion(rng)}/tree")
+
+
+async def create_comment(client, state, rng):
+    author_id = state.user(rng)
+    res = await client.post(
+        f"/comments/discussion/{state.discussion(rng)}",
+        params={"author_id": author_id},
+        json={"body": f"benchmark comment {rng.random()}"},
+    )
+    if res.status_code == 200:
+        state.written.append((res.json()["id"], author_id))
+    return res
+
+
+async def edit_comment(client, state, rng):
+    if not state.written:
+        return await create_comment(client, state, rng)
+    comment_id, author_id = rng.choice(state.written)
+    return await client.patch(f"/comments/{comment_id}", params={"author_id": author_id}, json={"body": "edited"})
+
+
+async def delete_comment(client, state, rng):
+    if not state.written:
+        return await create_comment(client, state, rng)
+    comment_id, author_id = state.written.pop(rng.randrange(len(state.written)))
+    return await client.delete(f"/comments/{comment_id}", params={"author_id": author_id})
+
+
+async def create_discussion(client, state, rng):
+    return await client.post(
+        "/discussions/",
+        params={"author_id": state.user(rng)},
+        json={"title": "benchmark discussion", "body": "body"},
+    )
+
+
+OPERATIONS = {
+    "list": list_discussions,
+    "list_hot": list_hot,
+    "thread": thread,
+    "tree": tree,
+    "create_comment": create_comment,
+    "edit_comment": edit_comment,
+    "delete_comment": delete_comment,
+    "create_discussion": create_discussion,
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def _worker(client, state, rng, weights, deadline, samples, errors):
+    names = list(weights)
+    cum_weights = []
+    total = 0
+    for name in names:
+        total += weights[name]
+        cum_weights.append(total)
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, cum_weights=cum_weights)[0]
+        started = time.perf_counter()
+        try:
+            res = await OPERATIONS[name](client, state, rng)
+            failed = res.status_code >= 400
+        except Exception:
+            failed = True
+        samples[name].append(time.perf_counter() - started)
+        if failed:
+            errors[name] += 1
+
+
+async def run(app, dataset: dict, workload: str, seconds: float, concurrency: int, seed: int) -> dict:
+    import httpx
+
+    state = State(dataset)
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        deadline = started + seconds
+        await asyncio.gather(*(
+            _worker(client, state, random.Random(seed + i), WORKLOADS[workload], deadline, samples, errors)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "dataset": dataset,
+        "workload": workload,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "total": summarize([s for v in samples.values() for s in v], sum(errors.values()), elapsed),
+        "operations": {name: summarize(samples[name], errors[name], elapsed) for name in sorted(samples)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="SQLite file; generated if missing (default: a temporary file)")
+    parser.add_argument("--comments", type=int, default=10_000, help="dataset size when generating")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.database or os.path.join(tmp, "forum.db")
+        reuse = os.path.exists(path)
+        # The app builds its engines at import time, so the URL must be set first.
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ.setdefault("HOT_REDECAY_INTERVAL", "0")
+        from app.database import engine
+        from . import dataset
+
+        dataset_info = dataset.describe(engine) if reuse else dataset.build(engine, args.comments, seed=args.seed)
+        from app.main import app  # checks the schema version on import
+
+        result = asyncio.run(run(app, dataset_info, args.workload, args.seconds, args.concurrency, args.seed))
+        engine.dispose()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Initial schema: users, discussions, comments
+
+The schema ``Base.metadata.create_all`` built before migrations existed.
+Every object is created only if missing, so a database from those days is
+adopted by running ``alembic upgrade head`` on it; the later revisions add
+what it lacks and backfill its rows.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "discussions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("body", sa.Text()),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("deleted", sa.Boolean()),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_discussions_id", "discussions", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("body", sa.Text()),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("discussion_id", sa.Integer(), sa.ForeignKey("discussions.id")),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("comments.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("deleted", sa.Boolean()),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_comments_id", "comments", ["id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("comments")
+    op.drop_table("discussions")
+    op.drop_table("users")
@@ -0,0 +1,89 @@
+"""Discussion stats and listing indexes: version, comment_count, last_activity_at, hot_score
+
+Existing discussions get the values ``maintenance.recompute_discussion_stats``
+would give them: live comments counted, last activity from the newest
+comment or the discussion itself, and ``hot_score`` computed at upgrade time.
+Without the backfill ``?sort=active`` would page over NULLs. The indexes
+serve the keyset listings and the thread queries.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+from app import ranking
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+discussions = sa.table(
+    "discussions",
+    sa.column("id", sa.Integer()),
+    sa.column("created_at", sa.DateTime()),
+    sa.column("comment_count", sa.Integer()),
+    sa.column("last_activity_at", sa.DateTime()),
+    sa.column("hot_score", sa.Float()),
+)
+comments = sa.table(
+    "comments",
+    sa.column("discussion_id", sa.Integer()),
+    sa.column("created_at", sa.DateTime()),
+    sa.column("deleted", sa.Boolean()),
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("discussions") as batch:
+        batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        batch.add_column(sa.Column("comment_count", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("last_activity_at", sa.DateTime(), nullable=True))
+        batch.add_column(sa.Column("hot_score", sa.Float(), nullable=False, server_default="0"))
+
+    live_count = (
+        sa.select(sa.func.count())
+        .where(comments.c.discussion_id == discussions.c.id, comments.c.deleted.is_not(True))
+        .scalar_subquery()
+    )
+    last_activity = sa.func.coalesce(
+        sa.select(sa.func.max(comments.c.created_at))
+        .where(comments.c.discussion_id == discussions.c.id)
+        .scalar_subquery(),
+        discussions.c.created_at,
+    )
+    bind = op.get_bind()
+    bind.execute(sa.update(discussions).values(comment_count=live_count, last_activity_at=last_activity))
+    now = datetime.utcnow()
+    rows = bind.execute(
+        sa.select(discussions.c.id, discussions.c.comment_count, discussions.c.created_at)
+        .where(discussions.c.created_at.is_not(None))
+    ).all()
+    if rows:
+        bind.execute(
+            sa.update(discussions).where(discussions.c.id == sa.bindparam("_id")),
+            [{"_id": id, "hot_score": ranking.hot_score(count, created_at, now)} for id, count, created_at in rows],
+        )
+
+    op.create_index("ix_discussions_created_at_id", "discussions", ["created_at", "id"])
+    op.create_index("ix_discussions_hot_score_id", "discussions", ["hot_score", "id"])
+    op.create_index("ix_discussions_comment_count_id", "discussions", ["comment_count", "id"])
+    op.create_index("ix_discussions_last_activity_at_id", "discussions", ["last_activity_at", "id"])
+    op.create_index("ix_comments_parent_id", "comments", ["parent_id"])
+    op.create_index("ix_comments_discussion_id_created_at_id", "comments", ["discussion_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_comments_discussion_id_created_at_id", table_name="comments")
+    op.drop_index("ix_comments_parent_id", table_name="comments")
+    op.drop_index("ix_discussions_last_activity_at_id", table_name="discussions")
+    op.drop_index("ix_discussions_comment_count_id", table_name="discussions")
+    op.drop_index("ix_discussions_hot_score_id", table_name="discussions")
+    op.drop_index("ix_discussions_created_at_id", table_name="discussions")
+    with op.batch_alter_table("discussions") as batch:
+        batch.drop_column("hot_score")
+        batch.drop_column("last_activity_at")
+        batch.drop_column("comment_count")
+        batch.drop_column("version")
@@ -0,0 +1,58 @@
+"""Change log and full-text search: ``changes``, the FTS5 tables and their triggers
+
+Rows already in the database are added to the search index and the change
+log, so an adopted database is searchable and syncable from the start.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from app import changes, search
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = [
+    f"{table}_{kind}_{action}"
+    for table in ("discussions", "comments")
+    for kind in ("changes", "fts")
+    for action in ("insert", "update", "delete")
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "changes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("discussion_id", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("entity", "entity_id"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_changes_discussion_id_id", "changes", ["discussion_id", "id"])
+
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for statement in search.DISCUSSIONS_DDL + search.COMMENTS_DDL + changes.DISCUSSIONS_DDL + changes.COMMENTS_DDL:
+        op.execute(statement)
+    op.execute(
+        "INSERT INTO discussions_fts(rowid, title, body) SELECT id, title, body FROM discussions WHERE NOT coalesce(deleted, 0)"
+    )
+    op.execute("INSERT INTO comments_fts(rowid, body) SELECT id, body FROM comments WHERE NOT coalesce(deleted, 0)")
+    op.execute("INSERT INTO changes(entity, entity_id, discussion_id) SELECT 'discussion', id, id FROM discussions")
+    op.execute("INSERT INTO changes(entity, entity_id, discussion_id) SELECT 'comment', id, discussion_id FROM comments")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS comments_fts")
+        op.execute("DROP TABLE IF EXISTS discussions_fts")
+    op.drop_index("ix_changes_discussion_id_id", table_name="changes")
+    op.drop_table("changes")
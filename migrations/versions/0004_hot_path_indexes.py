@@ -0,0 +1,43 @@
+"""Hot-path indexes: discussions by author, live discussions and comments
+
+``Comment(discussion_id, created_at)`` and ``Comment(parent_id)`` already
+exist (``ix_comments_discussion_id_created_at_id``, ``ix_comments_parent_id``).
+The partial indexes hold only live rows: counting a discussion's comments for
+the stats repair is an index-only range scan, and a user's live discussions
+are read newest first without stepping over the deleted ones.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_discussions_author_id", "discussions", ["author_id"])
+    op.create_index(
+        "ix_discussions_author_id_live",
+        "discussions",
+        ["author_id", "created_at", "id"],
+        sqlite_where=sa.text("deleted IS NOT 1"),
+        postgresql_where=sa.text("deleted IS NOT TRUE"),
+    )
+    op.create_index(
+        "ix_comments_discussion_id_live",
+        "comments",
+        ["discussion_id"],
+        sqlite_where=sa.text("deleted IS NOT 1"),
+        postgresql_where=sa.text("deleted IS NOT TRUE"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_comments_discussion_id_live", table_name="comments")
+    op.drop_index("ix_discussions_author_id_live", table_name="discussions")
+    op.drop_index("ix_discussions_author_id", table_name="discussions")
@@ -0,0 +1,68 @@
+"""Archive tables for compacted soft-deleted rows, partial indexes on dead rows
+
+``maintenance.archive_deleted`` moves discussions and comments deleted for
+longer than the retention out of the hot tables into these. The partial
+indexes hold only soft-deleted rows, so the job finds its candidates
+without scanning live ones.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "discussions_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("title", sa.String()),
+        sa.Column("body", sa.Text()),
+        sa.Column("author_id", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("deleted_at", sa.DateTime()),
+        sa.Column("comment_count", sa.Integer()),
+        sa.Column("last_activity_at", sa.DateTime()),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "comments_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("body", sa.Text()),
+        sa.Column("author_id", sa.Integer()),
+        sa.Column("discussion_id", sa.Integer()),
+        sa.Column("parent_id", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("deleted", sa.Boolean()),
+        sa.Column("deleted_at", sa.DateTime()),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_comments_archive_discussion_id", "comments_archive", ["discussion_id"])
+    op.create_index(
+        "ix_discussions_deleted_at_dead",
+        "discussions",
+        ["deleted_at"],
+        sqlite_where=sa.text("deleted IS 1"),
+        postgresql_where=sa.text("deleted IS TRUE"),
+    )
+    op.create_index(
+        "ix_comments_deleted_at_dead",
+        "comments",
+        ["deleted_at"],
+        sqlite_where=sa.text("deleted IS 1"),
+        postgresql_where=sa.text("deleted IS TRUE"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_comments_deleted_at_dead", table_name="comments")
+    op.drop_index("ix_discussions_deleted_at_dead", table_name="discussions")
+    op.drop_index("ix_comments_archive_discussion_id", table_name="comments_archive")
+    op.drop_table("comments_archive")
+    op.drop_table("discussions_archive")
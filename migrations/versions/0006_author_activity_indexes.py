@@ -0,0 +1,31 @@
+"""Author activity indexes: discussions and comments by (author_id, created_at, id)
+
+They serve the keyset pages of ``GET /users/{id}/discussions`` and
+``GET /users/{id}/comments`` as index range scans, however many posts the
+user has. The discussion index has ``author_id`` as its prefix, so the
+plain ``ix_discussions_author_id`` from 0004 is dropped.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_discussions_author_id_created_at_id", "discussions", ["author_id", "created_at", "id"]
+    )
+    op.create_index("ix_comments_author_id_created_at_id", "comments", ["author_id", "created_at", "id"])
+    op.drop_index("ix_discussions_author_id", table_name="discussions")
+
+
+def downgrade() -> None:
+    op.create_index("ix_discussions_author_id", "discussions", ["author_id"])
+    op.drop_index("ix_comments_author_id_created_at_id", table_name="comments")
+    op.drop_index("ix_discussions_author_id_created_at_id", table_name="discussions")
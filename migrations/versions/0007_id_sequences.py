@@ -0,0 +1,34 @@
+"""Id sequences for sharded storage
+
+With ``SHARD_URLS`` set, discussion and comment ids are allocated from this
+table in the global database, so they stay unique across shards. The
+sequences start after the ids already in use.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "id_sequences",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("next_id", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO id_sequences (name, next_id) "
+        "SELECT 'discussions', COALESCE(MAX(id), 0) + 1 FROM discussions "
+        "UNION ALL SELECT 'comments', COALESCE(MAX(id), 0) + 1 FROM comments"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("id_sequences")
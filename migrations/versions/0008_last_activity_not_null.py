@@ -0,0 +1,45 @@
+"""Make ``discussions.last_activity_at`` NOT NULL
+
+A NULL ``last_activity_at`` has no keyset position: a ``?sort=active`` page
+ending on one produced a cursor the next request rejected, and the sharded
+merge could not order it. Remaining NULLs take the discussion's
+``created_at``, as ``maintenance.recompute_discussion_stats`` would give them.
+
+SQLite rebuilds the table to change the column, which drops the search and
+change log triggers on it; they are created again.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from app import changes, search
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE discussions SET last_activity_at = coalesce(created_at, CURRENT_TIMESTAMP) "
+        "WHERE last_activity_at IS NULL"
+    )
+    with op.batch_alter_table("discussions") as batch:
+        batch.alter_column("last_activity_at", existing_type=sa.DateTime(), nullable=False)
+    _recreate_triggers()
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("discussions") as batch:
+        batch.alter_column("last_activity_at", existing_type=sa.DateTime(), nullable=True)
+    _recreate_triggers()
+
+
+def _recreate_triggers() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for statement in search.DISCUSSIONS_DDL + changes.DISCUSSIONS_DDL:
+        op.execute(statement)
@@ -1,16 +1,24 @@
+import os
+import shutil
+import tempfile
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
-from app.database import Base, get_db
-from app.main import app
 from fastapi.testclient import TestClient
 
 # In-memory SQLite DB
 TEST_DATABASE_URL = "sqlite://"
 
-# SQLite database URL for testing
-SQLITE_DATABASE_URL = "sqlite:///./test_db.db"
+# SQLite database for testing, created fresh for every run outside the working tree
+# (the app engine needs it at import time, before any tmp_path fixture exists).
+TEST_DIR = tempfile.mkdtemp(prefix="forum-tests-")
+SQLITE_DATABASE_URL = f"sqlite:///{os.path.join(TEST_DIR, 'test_db.db')}"
+
+# The app checks the schema version of its own engine on import; point it at the test database.
+os.environ["DATABASE_URL"] = SQLITE_DATABASE_URL
+from app import cache, migrate, usernames  # noqa: E402
+from app.database import get_db, get_read_db  # noqa: E402
 
 # Create a SQLAlchemy engine
 engine = create_engine(
@@ -23,7 +31,14 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create tables in the database
-Base.metadata.create_all(bind=engine)
+migrate.upgrade(engine)
+
+from app.main import app  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
 
 
 @pytest.fixture(scope="function")
@@ -32,6 +47,8 @@ def db_session():
     connection = engine.connect()
     transaction = connection.begin()
     session = TestingSessionLocal(bind=connection)
+    # Ids are reused once a test's transaction is rolled back
+    usernames.names.clear()
     yield session
     session.close()
     transaction.rollback()
@@ -49,5 +66,34 @@ def client(db_session):
             db_session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # Cached page bodies would outlive the rows of earlier tests, which were rolled back
+    cache.responses.clear()
     with TestClient(app) as test_client:
         yield test_client
+
+
+class QueryCounter:
+    """Collects the SQL statements executed on the test engine."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+@pytest.fixture(scope="function")
+def query_counter():
+    """Count SQL statements; call ``reset()`` right before the request under test."""
+    counter = QueryCounter()
+    event.listen(engine, "after_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "after_cursor_execute", counter)
@@ -0,0 +1,56 @@
+def test_bulk_users(client):
+    client.post("/users/", json={"username": "existing"})
+
+    res = client.post("/users/bulk", json=[
+        {"username": "bulk_a"},
+        {"username": "existing"},
+        {"username": "bulk_b", "id": 5000},
+        {"username": "bulk_a"},
+    ])
+    assert res.status_code == 200
+    result = res.json()
+    assert result["created"] == 2
+    assert result["ids"][1] is None and result["ids"][3] is None
+    assert result["ids"][2] == 5000
+    assert result["errors"] == [
+        {"index": 1, "detail": "Username already taken"},
+        {"index": 3, "detail": "Username already taken"},
+    ]
+
+
+def test_bulk_discussions_and_comments(client):
+    user = client.post("/users/", json={"username": "importer"}).json()
+
+    res = client.post("/discussions/bulk", json=[
+        {"title": "Imported", "body": "from elsewhere", "author_id": user["id"], "created_at": "2020-01-01T00:00:00"},
+        {"title": "Orphan", "body": "no author", "author_id": 9999},
+    ]).json()
+    assert res["created"] == 1
+    assert res["errors"] == [{"index": 1, "detail": "Author not found"}]
+    discussion_id = res["ids"][0]
+
+    res = client.post("/comments/bulk", json=[
+        {"id": 7000, "discussion_id": discussion_id, "author_id": user["id"], "body": "root"},
+        {"discussion_id": discussion_id, "author_id": user["id"], "body": "reply", "parent_id": 7000},
+        {"discussion_id": discussion_id, "author_id": user["id"], "body": "bad parent", "parent_id": 123456},
+        {"discussion_id": 999999, "author_id": user["id"], "body": "nowhere"},
+    ]).json()
+    assert res["created"] == 2
+    assert [e["index"] for e in res["errors"]] == [2, 3]
+
+    # Discussion stats and versions follow the import
+    listed = client.get("/discussions/").json()["items"][0]
+    assert listed["id"] == discussion_id
+    assert listed["created_at"] == "2020-01-01T00:00:00"
+    assert listed["comment_count"] == 2
+    assert listed["version"] == 2
+
+    tree = client.get(f"/comments/discussion/{discussion_id}/tree").json()
+    assert tree["items"][0]["replies"][0]["body"] == "reply"
+
+
+def test_bulk_too_many_items(client, monkeypatch):
+    from app import config
+    monkeypatch.setattr(config, "BULK_MAX_ITEMS", 1)
+    res = client.post("/users/bulk", json=[{"username": "x"}, {"username": "y"}])
+    assert res.status_code == 413
@@ -0,0 +1,67 @@
+from sqlalchemy import delete
+from app import models
+
+
+def _setup(client):
+    user = client.post("/users/", json={"username": "syncer"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Offline", "body": "sync me"
+    }).json()
+    comments = [
+        client.post(f"/comments/discussion/{disc['id']}", params={"author_id": user["id"]}, json={"body": body}).json()
+        for body in ("one", "two", "three")
+    ]
+    return user, disc, comments
+
+
+def _changed(page):
+    return [(item["type"], item["id"]) for item in page["items"]]
+
+
+def _by_key(page):
+    return {(item["type"], item["id"]): item for item in page["items"]}
+
+
+def test_changes_since_cursor(client):
+    user, disc, comments = _setup(client)
+
+    page = client.get("/changes/").json()
+    # One entry per row, however often it changed
+    assert sorted(_changed(page)) == sorted([("comment", c["id"]) for c in comments] + [("discussion", disc["id"])])
+    assert _by_key(page)[("discussion", disc["id"])]["discussion"]["comment_count"] == 3
+    assert page["has_more"] is False
+    cursor = page["next_cursor"]
+
+    # Nothing new: empty page, same cursor
+    assert client.get("/changes/", params={"since": cursor}).json() == {"items": [], "next_cursor": cursor, "has_more": False}
+
+    client.patch(f"/comments/{comments[1]['id']}", params={"author_id": user["id"]}, json={"body": "edited"})
+    client.delete(f"/comments/{comments[2]['id']}", params={"author_id": user["id"]})
+    page = _by_key(client.get("/changes/", params={"since": cursor}).json())
+    assert set(page) == {("comment", comments[1]["id"]), ("comment", comments[2]["id"]), ("discussion", disc["id"])}
+    assert page[("comment", comments[1]["id"])]["comment"]["body"] == "edited"
+    assert page[("comment", comments[2]["id"])]["comment"]["deleted"] is True
+
+
+def test_changes_paged_and_scoped(client, db_session):
+    user, disc, comments = _setup(client)
+    other = client.post("/discussions/", params={"author_id": user["id"]}, json={"title": "Other", "body": "x"}).json()
+
+    first = client.get("/changes/", params={"discussion_id": disc["id"], "limit": 2}).json()
+    assert first["has_more"] is True
+    page = client.get("/changes/", params={"discussion_id": disc["id"], "since": first["next_cursor"]}).json()
+    assert page["has_more"] is False
+    assert sorted(_changed(first) + _changed(page)) == sorted(
+        [("comment", c["id"]) for c in comments] + [("discussion", disc["id"])]
+    )
+
+    assert ("discussion", other["id"]) not in _changed(first) + _changed(page)
+
+    # Rows removed from the table come back as bare tombstones
+    cursor = client.get("/changes/").json()["next_cursor"]
+    db_session.execute(delete(models.Comment).where(models.Comment.id == comments[0]["id"]))
+    db_session.commit()
+    item, = client.get("/changes/", params={"since": cursor}).json()["items"]
+    assert (item["type"], item["id"], item["removed"], item["comment"]) == ("comment", comments[0]["id"], True, None)
+
+    assert client.get("/changes/", params={"since": "abc"}).status_code == 400
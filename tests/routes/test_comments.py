@@ -1,3 +1,11 @@
+import asyncio
+import httpx
+import pytest
+from app import config, models
+from app.main import app
+from app.routes import comments
+
+
 def test_create_and_get_comments(client):
     # User A creates the discussion and top-level comment
     user_a_res = client.post("/users/", json={"username": "a"})
@@ -42,7 +50,7 @@ def test_create_and_get_comments(client):
     # Get comments for the discussion
     response = client.get(f"/comments/discussion/{discussion_id}")
     assert response.status_code == 200
-    comments = response.json()
+    comments = response.json()["items"]
 
     # Make sure both comments are there
     bodies = [c["body"] for c in comments]
@@ -90,9 +98,10 @@ def test_get_comments_for_empty_discussion(client):
     res = client.get(f"/comments/discussion/{discussion_id}")
     assert res.status_code == 200
 
-    comments = res.json()
+    comments = res.json()["items"]
     assert isinstance(comments, list)
     assert comments == []
+    assert res.json()["next_cursor"] is None
 
 
 def test_edit_nonexistent_comment(client):
@@ -171,7 +180,7 @@ def test_soft_delete_comment(client):
 
     # Fetch it again
     res = client.get(f"/comments/discussion/{disc['id']}")
-    deleted_comment = next(c for c in res.json() if c["id"] == comment["id"])
+    deleted_comment = next(c for c in res.json()["items"] if c["id"] == comment["id"])
     assert deleted_comment["deleted"] is True
 
 
@@ -203,3 +212,262 @@ def test_delete_comment_forbidden_unauthorized(client):
     )
     assert res.status_code == 403
     assert res.json()["detail"] == "Unauthorized"
+
+
+def test_get_comments_paginated(client):
+    user = client.post("/users/", json={"username": "pager"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Long thread", "body": "many replies"
+    }).json()
+    for i in range(5):
+        client.post(
+            f"/comments/discussion/{disc['id']}",
+            params={"author_id": user["id"]},
+            json={"body": f"reply {i}"}
+        )
+
+    bodies = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get(f"/comments/discussion/{disc['id']}", params=params).json()
+        assert len(page["items"]) <= 2
+        bodies += [c["body"] for c in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Oldest first, every comment exactly once
+    assert bodies == [f"reply {i}" for i in range(5)]
+
+
+def test_get_comments_invalid_cursor(client):
+    res = client.get("/comments/discussion/1", params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Invalid cursor"
+
+
+def _reply(client, discussion_id, author_id, body, parent_id=None):
+    return client.post(
+        f"/comments/discussion/{discussion_id}",
+        params={"author_id": author_id},
+        json={"body": body, "parent_id": parent_id}
+    ).json()
+
+
+def test_get_comment_tree(client):
+    user = client.post("/users/", json={"username": "threader"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Deep thread", "body": "nest me"
+    }).json()
+
+    root = _reply(client, disc["id"], user["id"], "root")
+    child = _reply(client, disc["id"], user["id"], "child", root["id"])
+    _reply(client, disc["id"], user["id"], "grandchild", child["id"])
+    _reply(client, disc["id"], user["id"], "second child", root["id"])
+    _reply(client, disc["id"], user["id"], "other root")
+
+    res = client.get(f"/comments/discussion/{disc['id']}/tree")
+    assert res.status_code == 200
+    tree = res.json()
+    assert tree["more_replies"] == 0
+    assert [n["body"] for n in tree["items"]] == ["root", "other root"]
+
+    top = tree["items"][0]
+    assert top["depth"] == 0
+    assert top["reply_count"] == 2
+    assert [n["body"] for n in top["replies"]] == ["child", "second child"]
+    assert top["replies"][0]["replies"][0]["body"] == "grandchild"
+    assert top["replies"][0]["replies"][0]["depth"] == 2
+
+
+def test_thread_with_authors(client):
+    owner = client.post("/users/", json={"username": "owner"}).json()
+    guest = client.post("/users/", json={"username": "guest"}).json()
+    disc = client.post("/discussions/", params={"author_id": owner["id"]}, json={"title": "t", "body": "b"}).json()
+    root = _reply(client, disc["id"], owner["id"], "root")
+    _reply(client, disc["id"], guest["id"], "reply", root["id"])
+    expected = {str(owner["id"]): "owner", str(guest["id"]): "guest"}
+
+    page = client.get(f"/comments/discussion/{disc['id']}", params={"with_authors": True}).json()
+    assert page["authors"] == expected
+    tree = client.get(f"/comments/discussion/{disc['id']}/tree", params={"with_authors": True}).json()
+    assert tree["authors"] == expected
+    assert client.get(f"/comments/discussion/{disc['id']}/tree").json()["authors"] is None
+
+
+def test_get_comment_tree_limits(client):
+    user = client.post("/users/", json={"username": "limiter"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Busy thread", "body": "trim me"
+    }).json()
+
+    root = _reply(client, disc["id"], user["id"], "root")
+    for i in range(3):
+        child = _reply(client, disc["id"], user["id"], f"child {i}", root["id"])
+    _reply(client, disc["id"], user["id"], "too deep", child["id"])
+    _reply(client, disc["id"], user["id"], "second root")
+
+    tree = client.get(
+        f"/comments/discussion/{disc['id']}/tree",
+        params={"max_depth": 1, "max_children": 1}
+    ).json()
+
+    # Only the first root is kept, the second is counted
+    assert [n["body"] for n in tree["items"]] == ["root"]
+    assert tree["more_replies"] == 1
+
+    top = tree["items"][0]
+    assert [n["body"] for n in top["replies"]] == ["child 0"]
+    assert top["more_replies"] == 2
+
+    # Depth limit stops below the first level of replies
+    assert top["replies"][0]["replies"] == []
+
+
+def test_get_comment_tree_depth_cutoff_counts_replies(client):
+    user = client.post("/users/", json={"username": "cutoff"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Cut", "body": "depth"
+    }).json()
+    root = _reply(client, disc["id"], user["id"], "root")
+    _reply(client, disc["id"], user["id"], "hidden", root["id"])
+
+    tree = client.get(f"/comments/discussion/{disc['id']}/tree", params={"max_depth": 0}).json()
+    assert tree["items"][0]["replies"] == []
+    assert tree["items"][0]["more_replies"] == 1
+
+
+def test_get_comment_tree_ignores_replies_from_other_discussions(client, db_session):
+    user = client.post("/users/", json={"username": "crosser"}).json()
+    first, second = (
+        client.post("/discussions/", params={"author_id": user["id"]}, json={"title": t, "body": "b"}).json()
+        for t in ("first", "second")
+    )
+    root = _reply(client, first["id"], user["id"], "root")
+    # Rows written before parents were checked against their discussion
+    db_session.add(models.Comment(body="stray", author_id=user["id"], discussion_id=second["id"], parent_id=root["id"]))
+    db_session.commit()
+
+    tree = client.get(f"/comments/discussion/{first['id']}/tree").json()
+    assert tree["items"][0]["replies"] == []
+    assert tree["items"][0]["reply_count"] == 0
+
+
+def test_comment_pages_cached_and_invalidated(client):
+    user = client.post("/users/", json={"username": "cached"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Hot", "body": "read often"
+    }).json()
+    comment = _reply(client, disc["id"], user["id"], "first")
+
+    url = f"/comments/discussion/{disc['id']}"
+    client.get(url)
+    client.get(url)
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    # Every kind of comment write drops the cached pages of the thread
+    _reply(client, disc["id"], user["id"], "second")
+    assert [c["body"] for c in client.get(url).json()["items"]] == ["first", "second"]
+
+    client.patch(f"/comments/{comment['id']}", params={"author_id": user["id"]}, json={"body": "edited"})
+    assert client.get(url).json()["items"][0]["body"] == "edited"
+
+    client.delete(f"/comments/{comment['id']}", params={"author_id": user["id"]})
+    assert client.get(url).json()["items"][0]["deleted"] is True
+
+
+def test_thread_etag_conditional_get(client):
+    user = client.post("/users/", json={"username": "poller"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Polled", "body": "etag"
+    }).json()
+    comment = _reply(client, disc["id"], user["id"], "first")
+
+    url = f"/comments/discussion/{disc['id']}"
+    res = client.get(url)
+    etag = res.headers["ETag"]
+
+    res = client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert client.get(f"{url}/tree", headers={"If-None-Match": etag}).status_code == 304
+
+    # Each comment write moves the version on
+    seen = {etag}
+    for write in (
+        lambda: _reply(client, disc["id"], user["id"], "second"),
+        lambda: client.patch(f"/comments/{comment['id']}", params={"author_id": user["id"]}, json={"body": "x"}),
+        lambda: client.delete(f"/comments/{comment['id']}", params={"author_id": user["id"]}),
+    ):
+        write()
+        res = client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        etag = res.headers["ETag"]
+        assert etag not in seen
+        seen.add(etag)
+
+
+def test_create_comments_group_commit(client, db_session, query_counter, monkeypatch):
+    user = client.post("/users/", json={"username": "burst"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Viral", "body": "everyone replies"
+    }).json()
+    monkeypatch.setattr(config, "COMMENT_BATCHING", True)
+    monkeypatch.setattr(comments.comment_batches, "window", 0.05)
+    monkeypatch.setattr(comments.comment_batches, "sessions", lambda: db_session)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            url = f"/comments/discussion/{disc['id']}"
+            return await asyncio.gather(
+                *(ac.post(url, params={"author_id": user["id"]}, json={"body": f"reply {i}"}) for i in range(20)),
+                ac.post(url, params={"author_id": 999999}, json={"body": "nobody"}),
+            )
+
+    batches = comments.comment_batches.batches
+    query_counter.reset()
+    *created, rejected = asyncio.run(burst())
+
+    # The whole burst is one transaction that updates the discussion's stats once
+    assert comments.comment_batches.batches == batches + 1
+    assert sum(s.startswith("UPDATE discussions") for s in query_counter.statements) == 1
+    assert [res.status_code for res in created] == [200] * 20
+    assert [res.json()["body"] for res in created] == [f"reply {i}" for i in range(20)]
+    assert len({res.json()["id"] for res in created}) == 20
+    assert rejected.status_code == 404
+
+    page = client.get(f"/comments/discussion/{disc['id']}").json()
+    assert sorted(c["id"] for c in page["items"]) == sorted(res.json()["id"] for res in created)
+    listing = client.get("/discussions/").json()["items"]
+    assert listing[0]["comment_count"] == 20
+
+
+@pytest.mark.parametrize("batching", [False, True])
+def test_create_comment_validation_same_with_group_commit(client, db_session, monkeypatch, batching):
+    user = client.post("/users/", json={"username": "checker"}).json()
+    first, second = (
+        client.post("/discussions/", params={"author_id": user["id"]}, json={"title": t, "body": "b"}).json()
+        for t in ("first", "second")
+    )
+    root = _reply(client, first["id"], user["id"], "root")
+    monkeypatch.setattr(config, "COMMENT_BATCHING", batching)
+    monkeypatch.setattr(comments.comment_batches, "window", 0.01)
+    monkeypatch.setattr(comments.comment_batches, "sessions", lambda: db_session)
+
+    missing = client.post("/comments/discussion/999999", params={"author_id": user["id"]}, json={"body": "x"})
+    assert (missing.status_code, missing.json()["detail"]) == (404, "Discussion not found")
+    stray = client.post(
+        f"/comments/discussion/{second['id']}", params={"author_id": user["id"]}, json={"body": "x", "parent_id": root["id"]}
+    )
+    assert (stray.status_code, stray.json()["detail"]) == (404, "Parent comment not found in discussion")
+    reply = client.post(
+        f"/comments/discussion/{first['id']}", params={"author_id": user["id"]}, json={"body": "ok", "parent_id": root["id"]}
+    )
+    assert reply.status_code == 200
+    assert reply.json()["parent_id"] == root["id"]
@@ -1,3 +1,8 @@
+import asyncio
+import httpx
+from app.main import app
+
+
 def test_create_discussion(client):
     # First create a user
     user_res = client.post("/users/", json={"username": "test_author"})
@@ -47,10 +52,48 @@ def test_list_discussions(client):
 
     response = client.get("/discussions/")
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) >= 5
 
 
+def test_list_discussions_paginated(client):
+    user = client.post("/users/", json={"username": "pager"}).json()
+    for i in range(5):
+        client.post("/discussions/", params={"author_id": user["id"]}, json={
+            "title": f"Page post {i}",
+            "body": "paginated"
+        })
+
+    first = client.get("/discussions/", params={"limit": 3}).json()
+    assert len(first["items"]) == 3
+    assert first["next_cursor"] is not None
+
+    second = client.get("/discussions/", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    ids = [d["id"] for d in first["items"] + second["items"]]
+
+    # Newest first, no duplicates across pages
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(set(ids))
+    assert [d["title"] for d in first["items"]] == [f"Page post {i}" for i in (4, 3, 2)]
+
+
+def test_list_discussions_with_authors(client):
+    alice = client.post("/users/", json={"username": "alice"}).json()
+    bob = client.post("/users/", json={"username": "bob"}).json()
+    for user in (alice, bob, alice):
+        client.post("/discussions/", params={"author_id": user["id"]}, json={"title": "t", "body": "b"})
+
+    assert client.get("/discussions/").json()["authors"] is None
+    page = client.get("/discussions/", params={"with_authors": True}).json()
+    assert page["authors"] == {str(alice["id"]): "alice", str(bob["id"]): "bob"}
+    assert {str(d["author_id"]) for d in page["items"]} == set(page["authors"])
+
+
+def test_list_discussions_limit_bounds(client):
+    assert client.get("/discussions/", params={"limit": 0}).status_code == 422
+    assert client.get("/discussions/", params={"limit": 1000}).status_code == 422
+
+
 def test_edit_nonexistent_discussion(client):
     user = client.post("/users/", json={"username": "ghost"}).json()
 
@@ -110,3 +153,162 @@ def test_edit_and_delete_discussion(client):
 
     assert res.status_code == 200
     assert res.json()["message"] == "Discussion marked as deleted"
+
+
+def test_listing_cache_invalidated_on_writes(client):
+    user = client.post("/users/", json={"username": "lister"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Before", "body": "cached"
+    }).json()
+    assert client.get("/discussions/").json()["items"][0]["title"] == "Before"
+
+    client.patch(f"/discussions/{disc['id']}", params={"author_id": user["id"]}, json={"title": "After"})
+    assert client.get("/discussions/").json()["items"][0]["title"] == "After"
+
+    client.post("/discussions/", params={"author_id": user["id"]}, json={"title": "Newer", "body": "x"})
+    assert client.get("/discussions/").json()["items"][0]["title"] == "Newer"
+
+
+def test_listing_etag_conditional_get(client):
+    user = client.post("/users/", json={"username": "etag_lister"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Versioned", "body": "v1"
+    }).json()
+    assert disc["version"] == 1
+
+    etag = client.get("/discussions/").headers["ETag"]
+    assert client.get("/discussions/", headers={"If-None-Match": etag}).status_code == 304
+
+    edited = client.patch(f"/discussions/{disc['id']}", params={"author_id": user["id"]}, json={"body": "v2"}).json()
+    assert edited["version"] == 2
+
+    res = client.get("/discussions/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert res.json()["items"][0]["body"] == "v2"
+
+
+def test_comment_stats_maintained(client):
+    user = client.post("/users/", json={"username": "counter"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Counted", "body": "replies"
+    }).json()
+    assert disc["comment_count"] == 0
+    assert disc["last_activity_at"] == disc["created_at"]
+
+    comments = [
+        client.post(
+            f"/comments/discussion/{disc['id']}",
+            params={"author_id": user["id"]},
+            json={"body": f"c{i}"}
+        ).json()
+        for i in range(3)
+    ]
+    listed = client.get("/discussions/").json()["items"][0]
+    assert listed["comment_count"] == 3
+    assert listed["last_activity_at"] == comments[-1]["created_at"]
+
+    # Deleting twice only counts once
+    for _ in range(2):
+        client.delete(f"/comments/{comments[0]['id']}", params={"author_id": user["id"]})
+    assert client.get("/discussions/").json()["items"][0]["comment_count"] == 2
+
+
+def test_list_discussions_sorted(client):
+    user = client.post("/users/", json={"username": "ranker"}).json()
+    quiet, busy, latest = [
+        client.post("/discussions/", params={"author_id": user["id"]}, json={
+            "title": title, "body": "rank me"
+        }).json()
+        for title in ("quiet", "busy", "latest")
+    ]
+    for i in range(3):
+        client.post(f"/comments/discussion/{busy['id']}", params={"author_id": user["id"]}, json={"body": f"{i}"})
+    client.post(f"/comments/discussion/{quiet['id']}", params={"author_id": user["id"]}, json={"body": "late reply"})
+
+    def titles(sort, **params):
+        return [d["title"] for d in client.get("/discussions/", params={"sort": sort, **params}).json()["items"]]
+
+    assert titles("new") == ["latest", "busy", "quiet"]
+    assert titles("top") == ["busy", "quiet", "latest"]
+    assert titles("active") == ["quiet", "busy", "latest"]
+    assert titles("hot")[0] == "busy"
+
+    # Keyset pages work for every order
+    for sort in ("new", "hot", "top", "active"):
+        first = client.get("/discussions/", params={"sort": sort, "limit": 2}).json()
+        rest = titles(sort, limit=2, cursor=first["next_cursor"])
+        assert [d["title"] for d in first["items"]] + rest == titles(sort)
+
+    assert client.get("/discussions/", params={"sort": "random"}).status_code == 422
+
+
+async def _open_stream(path, headers=()):
+    """Start a GET on the raw ASGI app; returns the sent messages and a disconnect switch."""
+    messages = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    task = asyncio.ensure_future(app(scope, receive, messages.put))
+    return messages, disconnected, task
+
+
+async def _next_event(messages):
+    """Read body chunks up to the next SSE event; returns its (id, event, data) fields."""
+    while True:
+        message = await asyncio.wait_for(messages.get(), 5)
+        body = message.get("body", b"").decode()
+        if body.startswith("id:"):
+            return dict(line.split(": ", 1) for line in body.strip().split("\n"))
+
+
+def test_discussion_stream(client):
+    user = client.post("/users/", json={"username": "watcher"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Live", "body": "watch me"
+    }).json()
+    assert client.get("/discussions/999999/stream").status_code == 404
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            messages, disconnected, task = await _open_stream(f"/discussions/{disc['id']}/stream")
+            start = await asyncio.wait_for(messages.get(), 5)
+            assert start["status"] == 200
+            assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+
+            url = f"/comments/discussion/{disc['id']}"
+            comment = (await ac.post(url, params={"author_id": user["id"]}, json={"body": "first"})).json()
+            created = await _next_event(messages)
+            await ac.patch(f"/comments/{comment['id']}", params={"author_id": user["id"]}, json={"body": "edited"})
+            updated = await _next_event(messages)
+            disconnected.set()
+            await asyncio.wait_for(task, 5)
+
+            # Reconnecting after the first event replays what was missed
+            await ac.delete(f"/comments/{comment['id']}", params={"author_id": user["id"]})
+            messages, disconnected, task = await _open_stream(
+                f"/discussions/{disc['id']}/stream", [("Last-Event-ID", created["id"])]
+            )
+            replayed = [await _next_event(messages), await _next_event(messages)]
+            disconnected.set()
+            await asyncio.wait_for(task, 5)
+            return created, updated, replayed
+
+    created, updated, replayed = asyncio.run(scenario())
+    assert created["event"] == "comment_created"
+    assert '"body":"first"' in created["data"]
+    assert updated["event"] == "comment_updated"
+    assert int(updated["id"]) > int(created["id"])
+    assert replayed[0] == updated
+    assert replayed[1]["event"] == "comment_deleted"
+    assert '"deleted":true' in replayed[1]["data"]
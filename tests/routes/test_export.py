@@ -0,0 +1,54 @@
+import json
+
+
+def _lines(res):
+    return [json.loads(line) for line in res.text.splitlines()]
+
+
+def test_export_discussion(client, monkeypatch):
+    from app import config
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 2)
+
+    user = client.post("/users/", json={"username": "exporter"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Archive me", "body": "all of it"
+    }).json()
+    comments = [
+        client.post(
+            f"/comments/discussion/{disc['id']}",
+            params={"author_id": user["id"]},
+            json={"body": f"c{i}"}
+        ).json()
+        for i in range(5)
+    ]
+    client.delete(f"/comments/{comments[0]['id']}", params={"author_id": user["id"]})
+
+    res = client.get(f"/discussions/{disc['id']}/export")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+
+    lines = _lines(res)
+    assert lines[0]["type"] == "discussion"
+    assert lines[0]["title"] == "Archive me"
+    assert lines[0]["comment_count"] == 4
+    assert [l["body"] for l in lines[1:]] == [f"c{i}" for i in range(5)]
+    assert lines[1]["deleted"] is True
+    assert lines[1]["created_at"] == comments[0]["created_at"]
+
+
+def test_export_missing_discussion(client):
+    res = client.get("/discussions/99999/export")
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Discussion not found"
+
+
+def test_export_forum(client):
+    user = client.post("/users/", json={"username": "everything"}).json()
+    disc = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Whole forum", "body": "dump"
+    }).json()
+    client.post(f"/comments/discussion/{disc['id']}", params={"author_id": user["id"]}, json={"body": "hi"})
+
+    lines = _lines(client.get("/export"))
+    assert [l["type"] for l in lines] == ["user", "discussion", "comment"]
+    assert lines[0] == {"type": "user", "id": user["id"], "username": "everything"}
@@ -0,0 +1,61 @@
+def _setup(client):
+    user = client.post("/users/", json={"username": "searcher"}).json()
+    python = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Python packaging", "body": "How do you ship wheels?"
+    }).json()
+    rust = client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Rust lifetimes", "body": "Borrowing from python ideas"
+    }).json()
+    return user, python, rust
+
+
+def test_search_discussions_ranked_with_snippets(client):
+    user, python, rust = _setup(client)
+
+    res = client.get("/search/", params={"q": "python"})
+    assert res.status_code == 200
+    hits = res.json()["items"]
+
+    # Title matches rank above body matches
+    assert [h["id"] for h in hits] == [python["id"], rust["id"]]
+    assert hits[0]["type"] == "discussion"
+    assert "<mark>Python</mark>" in hits[0]["snippet"]
+
+    # Prefixes and punctuation are safe
+    assert [h["id"] for h in client.get("/search/", params={"q": "pack*"}).json()["items"]] == [python["id"]]
+    assert client.get("/search/", params={"q": 'wheels? "OR AND'}).status_code == 200
+
+
+def test_search_follows_edits_and_deletes(client):
+    user, python, rust = _setup(client)
+
+    client.patch(f"/discussions/{python['id']}", params={"author_id": user["id"]}, json={"title": "Go modules"})
+    assert [h["id"] for h in client.get("/search/", params={"q": "packaging"}).json()["items"]] == []
+    assert [h["id"] for h in client.get("/search/", params={"q": "modules"}).json()["items"]] == [python["id"]]
+
+    client.delete(f"/discussions/{rust['id']}", params={"author_id": user["id"]})
+    assert client.get("/search/", params={"q": "lifetimes"}).json()["items"] == []
+
+
+def test_search_comments_paginated(client):
+    user, python, rust = _setup(client)
+    comments = [
+        client.post(
+            f"/comments/discussion/{python['id']}",
+            params={"author_id": user["id"]},
+            json={"body": f"wheel tip number {i}"}
+        ).json()
+        for i in range(3)
+    ]
+    client.delete(f"/comments/{comments[0]['id']}", params={"author_id": user["id"]})
+
+    first = client.get("/search/", params={"q": "wheel", "type": "comments", "limit": 1}).json()
+    assert len(first["items"]) == 1
+    second = client.get("/search/", params={
+        "q": "wheel", "type": "comments", "limit": 1, "cursor": first["next_cursor"]
+    }).json()
+    assert second["next_cursor"] is None
+
+    found = {h["id"] for h in first["items"] + second["items"]}
+    assert found == {comments[1]["id"], comments[2]["id"]}
+    assert all(h["discussion_id"] == python["id"] for h in first["items"] + second["items"])
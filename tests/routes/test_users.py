@@ -14,3 +14,35 @@ def test_create_user_duplicate(client):
 def test_create_user_validation(client):
     response = client.post("/users/", json={})
     assert response.status_code == 422
+
+
+def test_user_activity_feeds(client):
+    author = client.post("/users/", json={"username": "prolific"}).json()
+    other = client.post("/users/", json={"username": "quiet"}).json()
+    discussions = [
+        client.post("/discussions/", params={"author_id": user["id"]}, json={"title": f"d{i}", "body": "b"}).json()
+        for i, user in enumerate([author, other, author, author])
+    ]
+    comments = [
+        client.post(f"/comments/discussion/{discussions[1]['id']}", params={"author_id": author["id"]},
+                    json={"body": f"c{i}"}).json()
+        for i in range(5)
+    ]
+    client.delete(f"/discussions/{discussions[2]['id']}", params={"author_id": author["id"]})
+    client.delete(f"/comments/{comments[0]['id']}", params={"author_id": author["id"]})
+
+    mine = client.get(f"/users/{author['id']}/discussions").json()
+    assert [d["title"] for d in mine["items"]] == ["d3", "d0"]
+    with_deleted = client.get(f"/users/{author['id']}/discussions", params={"include_deleted": True}).json()
+    assert [d["title"] for d in with_deleted["items"]] == ["d3", "d2", "d0"]
+
+    first = client.get(f"/users/{author['id']}/comments", params={"limit": 2}).json()
+    second = client.get(f"/users/{author['id']}/comments", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [c["body"] for c in first["items"] + second["items"]] == ["c4", "c3", "c2", "c1"]
+    assert second["next_cursor"] is None
+    assert client.get(f"/users/{other['id']}/comments").json()["items"] == []
+
+
+def test_user_activity_unknown_user(client):
+    assert client.get("/users/99999/discussions").status_code == 404
+    assert client.get("/users/99999/comments").json()["detail"] == "User not found"
@@ -0,0 +1,80 @@
+import pytest
+from app import admission, config
+from app.admission import ConcurrencyLimit, TokenBuckets, parse_route_limits
+
+
+def test_token_buckets_refill_and_evict_idle_keys():
+    buckets = TokenBuckets(rate=2, burst=3, max_keys=10)
+    assert [buckets.take("a", now=0.0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a", now=0.0) == pytest.approx(0.5)
+    assert buckets.take("a", now=0.5) == 0
+    assert buckets.rejected == 1
+
+    buckets.take("b", now=0.5)
+    assert len(buckets) == 2
+    # Idle for burst / rate seconds: both buckets are full again and dropped.
+    buckets.take("c", now=2.0)
+    assert len(buckets) == 1
+
+
+def test_token_buckets_bound_keys():
+    buckets = TokenBuckets(rate=1, burst=1, max_keys=3)
+    for key in range(10):
+        assert buckets.take(key, now=0.0) == 0
+    assert len(buckets) == 3
+
+
+def test_concurrency_limit():
+    limit = ConcurrencyLimit(1)
+    assert limit.try_acquire()
+    assert not limit.try_acquire()
+    limit.release()
+    assert limit.try_acquire()
+    assert limit.rejected == 1
+
+
+@pytest.mark.parametrize("rate, burst", [(0, 5), (-1, 5), (2, 0.5)])
+def test_token_buckets_reject_unusable_settings(rate, burst):
+    with pytest.raises(ValueError, match="AUTHOR_WRITE_RATE"):
+        TokenBuckets(rate, burst, max_keys=10, name="AUTHOR_WRITE_RATE:AUTHOR_WRITE_BURST")
+
+
+def test_parse_route_limits():
+    assert parse_route_limits("POST /discussions/=5:20, GET /search/=50") == {
+        "POST /discussions/": (5.0, 20.0),
+        "GET /search/": (50.0, 50.0),
+    }
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_CONTROL", True)
+    monkeypatch.setattr(admission, "author_buckets", TokenBuckets(rate=0.01, burst=2, max_keys=100))
+    monkeypatch.setattr(admission, "route_buckets", {"POST /users/": TokenBuckets(rate=0.01, burst=3, max_keys=1)})
+    monkeypatch.setattr(admission, "expensive_reads", ConcurrencyLimit(0))
+
+
+def test_rate_limits_per_author_and_route(client, limited):
+    users = [client.post("/users/", json={"username": f"limited{i}"}).json() for i in range(3)]
+    res = client.post("/users/", json={"username": "one too many"})
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+
+    spammer, other = users[0]["id"], users[1]["id"]
+    disc = client.post("/discussions/", params={"author_id": spammer}, json={"title": "t", "body": "b"}).json()
+    assert client.post(f"/comments/discussion/{disc['id']}", params={"author_id": spammer}, json={"body": "1"}).status_code == 200
+    res = client.post(f"/comments/discussion/{disc['id']}", params={"author_id": spammer}, json={"body": "2"})
+    assert res.status_code == 429
+    assert res.json()["detail"] == "Too many requests"
+    assert client.post(f"/comments/discussion/{disc['id']}", params={"author_id": other}, json={"body": "3"}).status_code == 200
+
+    metrics = client.get("/metrics").text
+    assert 'admission_rejected_total{reason="author"} 1' in metrics
+    assert 'route="/comments/discussion/{discussion_id}",status="429"' in metrics
+
+
+def test_expensive_reads_capped(client, limited):
+    res = client.get("/discussions/")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert client.get("/cache/stats").status_code == 200
@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app import cache
+from app.database import Base, get_db, get_read_db
+from app.main import app
+
+@pytest.fixture(scope="function")
+def async_client(tmp_path):
+    """Serve the app through AsyncSession on aiosqlite, as with DB_ASYNC=1."""
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            assert isinstance(db, AsyncSession)
+            yield db
+
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    cache.responses.clear()
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous)
+        sync_engine.dispose()
+
+
+def test_routes_with_async_session(async_client):
+    user = async_client.post("/users/", json={"username": "async_user"}).json()
+    assert async_client.post("/users/", json={"username": "async_user"}).status_code == 400
+
+    disc = async_client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Async", "body": "no threads"
+    }).json()
+    root = async_client.post(
+        f"/comments/discussion/{disc['id']}",
+        params={"author_id": user["id"]},
+        json={"body": "root"}
+    ).json()
+    async_client.post(
+        f"/comments/discussion/{disc['id']}",
+        params={"author_id": user["id"]},
+        json={"body": "reply", "parent_id": root["id"]}
+    )
+
+    res = async_client.patch(f"/comments/{root['id']}", params={"author_id": user["id"]}, json={"body": "edited"})
+    assert res.status_code == 200
+    assert res.json()["body"] == "edited"
+
+    page = async_client.get(f"/comments/discussion/{disc['id']}").json()
+    assert [c["body"] for c in page["items"]] == ["edited", "reply"]
+
+    tree = async_client.get(f"/comments/discussion/{disc['id']}/tree").json()
+    assert tree["items"][0]["replies"][0]["body"] == "reply"
+
+    assert async_client.delete(f"/discussions/{disc['id']}", params={"author_id": 9999}).status_code == 403
+    listing = async_client.get("/discussions/").json()
+    assert [d["id"] for d in listing["items"]] == [disc["id"]]
+
+
+def test_export_streams_with_async_session(async_client):
+    user = async_client.post("/users/", json={"username": "async_exporter"}).json()
+    disc = async_client.post("/discussions/", params={"author_id": user["id"]}, json={
+        "title": "Async export", "body": "stream"
+    }).json()
+    for i in range(3):
+        async_client.post(f"/comments/discussion/{disc['id']}", params={"author_id": user["id"]}, json={"body": f"{i}"})
+
+    lines = async_client.get(f"/discussions/{disc['id']}/export").text.splitlines()
+    assert len(lines) == 4
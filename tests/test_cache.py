@@ -0,0 +1,41 @@
+from app.cache import LRUCache
+
+
+def test_lru_eviction():
+    c = LRUCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now least recently used
+    c.set("c", 3)
+
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    c = LRUCache(maxsize=2, ttl=-1)
+    c.set("a", 1)
+    assert c.get("a") is None
+    assert c.stats()["expirations"] == 1
+
+
+def test_invalidate_by_tag():
+    c = LRUCache(maxsize=10, ttl=60)
+    c.set("page1", 1, tags=["thread:1"])
+    c.set("page2", 2, tags=["thread:1", "thread:2"])
+    c.set("other", 3, tags=["thread:3"])
+
+    c.invalidate("thread:1")
+    assert c.get("page1") is None
+    assert c.get("page2") is None
+    assert c.get("other") == 3
+
+
+def test_stale_set_is_dropped():
+    c = LRUCache(maxsize=10, ttl=60)
+    generation = c.generation()
+    c.invalidate("thread:1")  # a write lands while the value is computed
+    c.set("page", "stale", tags=["thread:1"], generation=generation)
+    assert c.get("page") is None
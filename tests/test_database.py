@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import make_engines
+
+
+def test_make_engines_splits_file_backed_sqlite(tmp_path):
+    writer, reader = make_engines(f"sqlite:///{tmp_path / 'forum.db'}")
+    assert writer is not reader
+    assert writer.pool.size() == 1
+
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+    writer.dispose()
+    reader.dispose()
+
+
+def test_make_engines_shares_in_memory_engine():
+    writer, reader = make_engines("sqlite://")
+    assert writer is reader
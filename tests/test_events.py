@@ -0,0 +1,54 @@
+import asyncio
+from app.events import Broker
+
+
+def test_replay_from_last_event_id():
+    async def scenario():
+        broker = Broker(history_size=10, queue_size=10)
+        broker.publish(1, "comment_created", b"{}")
+        broker.publish(2, "comment_created", b"{}")
+        broker.publish(1, "comment_updated", b"{}")
+
+        subscriber, replay = broker.subscribe(1, last_event_id=1)
+        assert [(e.id, e.type) for e in replay] == [(3, "comment_updated")]
+
+        broker.publish(1, "comment_deleted", b"{}")
+        event = await asyncio.wait_for(subscriber.queue.get(), 1)
+        assert (event.id, event.type) == (4, "comment_deleted")
+
+        # Unknown positions cannot be replayed
+        assert broker.subscribe(1, last_event_id=99)[1] is None
+        assert broker.subscribe(1, last_event_id=-1)[1] is None
+        assert broker.subscribe(1, last_event_id=0)[1] is not None
+
+    asyncio.run(scenario())
+
+
+def test_evicted_history_means_reset():
+    async def scenario():
+        broker = Broker(history_size=2, queue_size=10)
+        for _ in range(4):
+            broker.publish(1, "comment_created", b"{}")
+        assert broker.subscribe(1, last_event_id=1)[1] is None
+        assert [e.id for e in broker.subscribe(1, last_event_id=2)[1]] == [3, 4]
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        broker = Broker(history_size=10, queue_size=2)
+        slow, _ = broker.subscribe(1)
+        fast, _ = broker.subscribe(1)
+        for _ in range(3):
+            broker.publish(1, "comment_created", b"{}")
+            await fast.queue.get()
+        await asyncio.sleep(0)
+
+        assert slow.overflowed.is_set()
+        assert not fast.overflowed.is_set()
+        broker.unsubscribe(slow)
+        broker.unsubscribe(fast)
+        assert broker.stats() == {"subscribers": 0, "published": 3, "dropped": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,46 @@
+import pytest
+from app import config, fastjson
+from app.main import app
+
+pytestmark = pytest.mark.skipif(fastjson.orjson is None, reason="orjson is not installed")
+
+
+def _forum(client):
+    user = client.post("/users/", json={"username": "fast"}).json()
+    d = client.post("/discussions/", params={"author_id": user["id"]}, json={"title": "Fast ünïcode", "body": "x"}).json()
+    root = client.post(f"/comments/discussion/{d['id']}", params={"author_id": user["id"]}, json={"body": "root"}).json()
+    for i in range(3):
+        client.post(f"/comments/discussion/{d['id']}", params={"author_id": user["id"]},
+                    json={"body": f"reply {i}", "parent_id": root["id"]})
+    client.delete(f"/comments/{root['id']}", params={"author_id": user["id"]})
+    return d
+
+
+def test_fast_path_renders_identical_bodies(client, monkeypatch):
+    d = _forum(client)
+    urls = [
+        "/discussions/",
+        "/discussions/?sort=hot&limit=1",
+        f"/comments/discussion/{d['id']}",
+        f"/comments/discussion/{d['id']}?limit=2",
+        f"/comments/discussion/{d['id']}/tree?max_children=2",
+        "/search/?q=fast",
+        "/search/?q=reply&type=comments",
+    ]
+    monkeypatch.setattr(config, "RESPONSE_CACHE", False)
+    slow = {url: client.get(url) for url in urls}
+    monkeypatch.setattr(config, "FAST_JSON", True)
+    fast = {url: client.get(url) for url in urls}
+
+    for url in urls:
+        assert fast[url].status_code == slow[url].status_code == 200
+        assert fast[url].json() == slow[url].json(), url
+        assert fast[url].headers["content-type"] == "application/json"
+
+
+def test_fast_path_keeps_openapi_schemas(monkeypatch):
+    monkeypatch.setattr(config, "FAST_JSON", True)
+    app.openapi_schema = None
+    schema = app.openapi()
+    response = schema["paths"]["/discussions/"]["get"]["responses"]["200"]["content"]["application/json"]
+    assert response["schema"]["$ref"].endswith("/DiscussionPage")
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import models
+from app.maintenance import archive_deleted, recompute_discussion_stats, redecay_hot_scores
+from app.ranking import hot_score
+
+
+def test_recompute_discussion_stats_repairs_drift(db_session):
+    user = models.User(username="drift")
+    db_session.add(user)
+    db_session.flush()
+    disc = models.Discussion(title="t", body="b", author_id=user.id, comment_count=42)
+    clean = models.Discussion(title="t", body="b", author_id=user.id)
+    db_session.add_all([disc, clean])
+    db_session.flush()
+    db_session.add_all([
+        models.Comment(body="live", author_id=user.id, discussion_id=disc.id),
+        models.Comment(body="gone", author_id=user.id, discussion_id=disc.id, deleted=True),
+    ])
+    clean.last_activity_at = clean.created_at
+    db_session.commit()
+
+    assert recompute_discussion_stats(db_session) == 1
+
+    db_session.refresh(disc)
+    assert disc.comment_count == 1
+    assert disc.last_activity_at is not None
+    assert disc.version == 2
+    assert recompute_discussion_stats(db_session) == 0
+
+
+def test_redecay_hot_scores(db_session):
+    user = models.User(username="decay")
+    db_session.add(user)
+    db_session.flush()
+    created = datetime(2024, 1, 1)
+    busy, quiet, tail = (
+        models.Discussion(
+            title="t", body="b", author_id=user.id, created_at=created,
+            comment_count=count, hot_score=hot_score(count, created, created),
+        )
+        for count in (9, 5, 0)
+    )
+    db_session.add_all([busy, quiet, tail])
+    db_session.commit()
+
+    later = created + timedelta(hours=24)
+    # Only the front of the hot order is rewritten
+    assert redecay_hot_scores(db_session, now=later, top=2, batch_size=1) == 2
+
+    for disc in (busy, quiet, tail):
+        db_session.refresh(disc)
+    assert busy.hot_score == hot_score(9, created, later)
+    assert quiet.hot_score == hot_score(5, created, later)
+    assert quiet.hot_score < hot_score(5, created, created)
+    assert tail.hot_score == hot_score(0, created, created)
+
+
+def test_archive_deleted_keeps_tombstones_with_replies(db_session):
+    now = datetime(2024, 6, 1)
+    old, recent = now - timedelta(days=60), now - timedelta(days=1)
+    user = models.User(username="archivist")
+    db_session.add(user)
+    db_session.flush()
+    live = models.Discussion(title="live", body="b", author_id=user.id)
+    gone = models.Discussion(title="gone", body="b", author_id=user.id, deleted=True, deleted_at=old)
+    fresh = models.Discussion(title="fresh", body="b", author_id=user.id, deleted=True, deleted_at=recent)
+    db_session.add_all([live, gone, fresh])
+    db_session.flush()
+
+    def comment(discussion, parent=None, deleted_at=None):
+        c = models.Comment(
+            body="c", author_id=user.id, discussion_id=discussion.id,
+            parent_id=parent.id if parent else None, deleted=deleted_at is not None, deleted_at=deleted_at,
+        )
+        db_session.add(c)
+        db_session.flush()
+        return c
+
+    leaf = comment(live, deleted_at=old)
+    tombstone = comment(live, deleted_at=old)
+    reply = comment(live, tombstone)
+    chain = comment(live, deleted_at=old)
+    chain_reply = comment(live, chain, deleted_at=old)
+    too_recent = comment(live, deleted_at=recent)
+    orphans = [comment(gone), comment(gone, deleted_at=old)]
+    db_session.commit()
+    ids = {
+        "live": live.id, "gone": gone.id, "fresh": fresh.id, "tombstone": tombstone.id, "reply": reply.id,
+        "too_recent": too_recent.id, "version": live.version,
+    }
+    archived = {leaf.id, chain.id, chain_reply.id} | {c.id for c in orphans}
+
+    report = archive_deleted(db_session, now=now, retention_days=30, batch_size=2, pause=0)
+
+    assert report["comments"] == 5
+    assert report["discussions"] == 1
+    assert report["tombstones"] == 1
+    assert set(db_session.scalars(select(models.ArchivedComment.id))) == archived
+    assert db_session.scalars(select(models.ArchivedDiscussion.id)).all() == [ids["gone"]]
+    assert set(db_session.scalars(select(models.Comment.id))) == {ids["tombstone"], ids["reply"], ids["too_recent"]}
+    assert set(db_session.scalars(select(models.Discussion.id))) == {ids["live"], ids["fresh"]}
+    assert db_session.get(models.Discussion, ids["live"]).version > ids["version"]
+
+    again = archive_deleted(db_session, now=now, retention_days=30, batch_size=2, pause=0)
+    assert again["comments"] == again["discussions"] == 0
@@ -0,0 +1,57 @@
+import logging
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from app import config, metrics
+
+
+def test_histogram_render():
+    h = metrics.Histogram("demo_seconds", "Demo.", (0.1, 1.0))
+    labels = (("route", "/x"),)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(labels, value)
+
+    lines = h.render()
+    assert 'demo_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/x"} 4' in lines
+
+
+def test_metrics_endpoint_counts_queries_per_route(client):
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+    client.post("/users/", json={"username": "measured"})
+    client.get("/comments/discussion/1")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/users/",status="200"} 1' in body
+    # Route templates, not raw paths, label the series
+    assert 'route="/comments/discussion/{discussion_id}"' in body
+    assert 'http_request_db_queries_count{method="POST",route="/users/"} 1' in body
+    assert "response_cache_misses_total" in body
+
+
+def test_slow_request_log_includes_sql(client, monkeypatch, caplog):
+    monkeypatch.setattr(config, "SLOW_REQUEST_SECONDS", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        client.post("/users/", json={"username": "slowpoke"})
+
+    record = next(r for r in caplog.records if r.name == "app.slow_requests")
+    message = record.getMessage()
+    assert "Slow request POST /users/" in message
+    assert "INSERT INTO users" in message
+
+
+def test_failing_statements_leave_no_timer_behind():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        for _ in range(5):
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql("SELECT * FROM missing")
+        conn.exec_driver_sql("SELECT 1")
+        assert "query_started" not in conn.info
+    engine.dispose()
@@ -0,0 +1,129 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from app import cache, migrate
+from app.database import Base, get_db, get_read_db
+from app.main import app
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_match_models(engine):
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        migrate.check(engine)
+
+    migrate.upgrade(engine)
+    migrate.check(engine)
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": migrate.include_name})
+        assert compare_metadata(context, Base.metadata) == []
+    tables = inspect(engine).get_table_names()
+    assert {"discussions_fts", "comments_fts"} <= set(tables)
+
+
+# What Base.metadata.create_all built before migrations existed.
+BASELINE_DDL = [
+    "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR, PRIMARY KEY (id))",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE TABLE discussions (id INTEGER NOT NULL, title VARCHAR, body TEXT, author_id INTEGER, "
+    "created_at DATETIME, deleted BOOLEAN, deleted_at DATETIME, PRIMARY KEY (id), "
+    "FOREIGN KEY(author_id) REFERENCES users (id))",
+    "CREATE INDEX ix_discussions_id ON discussions (id)",
+    "CREATE TABLE comments (id INTEGER NOT NULL, body TEXT, author_id INTEGER, discussion_id INTEGER, "
+    "parent_id INTEGER, created_at DATETIME, deleted BOOLEAN, deleted_at DATETIME, PRIMARY KEY (id), "
+    "FOREIGN KEY(author_id) REFERENCES users (id), FOREIGN KEY(discussion_id) REFERENCES discussions (id), "
+    "FOREIGN KEY(parent_id) REFERENCES comments (id))",
+    "CREATE INDEX ix_comments_id ON comments (id)",
+]
+
+
+def test_adopts_database_created_before_migrations(engine):
+    with engine.begin() as conn:
+        for statement in BASELINE_DDL:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql("INSERT INTO users (id, username) VALUES (1, 'old')")
+        conn.exec_driver_sql(
+            "INSERT INTO discussions (id, title, body, author_id, created_at, deleted) VALUES "
+            "(1, 'quiet', 'row', 1, '2026-01-01 00:00:00.000000', 0), "
+            "(2, 'busy', 'row', 1, '2026-01-02 00:00:00.000000', 0)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO comments (id, body, author_id, discussion_id, parent_id, created_at, deleted) VALUES "
+            "(1, 'root', 1, 2, NULL, '2026-01-03 00:00:00.000000', 0), "
+            "(2, 'reply', 1, 2, 1, '2026-01-04 00:00:00.000000', 1)"
+        )
+
+    migrate.upgrade(engine)
+    migrate.check(engine)
+    with engine.connect() as conn:
+        stats = conn.exec_driver_sql(
+            "SELECT id, comment_count, last_activity_at, hot_score > 0, version FROM discussions ORDER BY id"
+        ).all()
+        assert stats == [
+            (1, 0, "2026-01-01 00:00:00.000000", 1, 1),
+            (2, 1, "2026-01-04 00:00:00.000000", 1, 1),
+        ]
+        assert conn.exec_driver_sql("SELECT entity, entity_id FROM changes ORDER BY id").all() == [
+            ("discussion", 1), ("discussion", 2), ("comment", 1), ("comment", 2),
+        ]
+        assert conn.exec_driver_sql("SELECT rowid FROM comments_fts WHERE comments_fts MATCH 'root'").all() == [(1,)]
+
+    db = sessionmaker(bind=engine)()
+
+    def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    cache.responses.clear()
+    try:
+        with TestClient(app) as client:
+            page = client.get("/discussions/", params={"sort": "active", "limit": 1})
+            assert page.status_code == 200
+            assert [d["id"] for d in page.json()["items"]] == [2]
+            rest = client.get("/discussions/", params={"sort": "active", "cursor": page.json()["next_cursor"]})
+            assert [d["id"] for d in rest.json()["items"]] == [1]
+            comments = client.get("/comments/discussion/2")
+            assert [c["id"] for c in comments.json()["items"]] == [1, 2]
+            tree = client.get("/comments/discussion/2/tree")
+            assert tree.status_code == 200
+            assert tree.json()["items"][0]["id"] == 1
+    finally:
+        app.dependency_overrides.clear()
+        cache.responses.clear()
+        db.close()
+
+
+def test_fills_missing_last_activity(engine):
+    migrate.upgrade(engine, "0007")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (id, username) VALUES (1, 'old')")
+        conn.exec_driver_sql(
+            "INSERT INTO discussions (id, title, body, author_id, created_at, last_activity_at) VALUES "
+            "(1, 'never active', 'row', 1, '2026-01-01 00:00:00.000000', NULL)"
+        )
+
+    migrate.upgrade(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT last_activity_at FROM discussions").scalar() == "2026-01-01 00:00:00.000000"
+        triggers = conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'discussions'")
+        assert len(triggers.all()) == 6
+
+
+def test_downgrade_to_base(engine):
+    migrate.upgrade(engine)
+    cfg = migrate.alembic_config()
+    with engine.begin() as conn:
+        cfg.attributes["connection"] = conn
+        command.downgrade(cfg, "base")
+    assert set(inspect(engine).get_table_names()) == {"alembic_version"}
@@ -0,0 +1,104 @@
+"""Per-endpoint SQL budgets.
+
+Every endpoint below runs against a thread of N comments and again after it
+has grown to 10N. The number of statements must stay within the budget and
+must not change with the data size, which catches N+1 patterns before they
+ship. The response cache is off so every request reaches the database.
+"""
+from collections import namedtuple
+import pytest
+from app import bulk, config, models, schemas
+
+N = 10
+
+Seed = namedtuple("Seed", "user_id discussion_id comment_id")
+
+# name -> (max statements, request built from the seed). Requests made while
+# building the request (fetching an ETag, creating a comment to delete) are
+# not counted.
+BUDGETS = {
+    "create user": (2, lambda c, s: ("post", "/users/", {"json": {"username": f"budget{c.counter()}"}})),
+    "create discussion": (2, lambda c, s: ("post", "/discussions/", {
+        "params": {"author_id": s.user_id}, "json": {"title": "t", "body": "b"}})),
+    "list discussions": (2, lambda c, s: ("get", "/discussions/", {})),
+    "list discussions with authors": (3, lambda c, s: ("get", "/discussions/", {"params": {"with_authors": True}})),
+    "list discussions by hot": (2, lambda c, s: ("get", "/discussions/", {"params": {"sort": "hot"}})),
+    "list discussions not modified": (1, lambda c, s: ("get", "/discussions/", {
+        "headers": {"If-None-Match": c.get("/discussions/").headers["ETag"]}})),
+    "create comment": (4, lambda c, s: ("post", f"/comments/discussion/{s.discussion_id}", {
+        "params": {"author_id": s.user_id}, "json": {"body": "more", "parent_id": s.comment_id}})),
+    "thread page": (2, lambda c, s: ("get", f"/comments/discussion/{s.discussion_id}", {})),
+    "thread page with authors": (3, lambda c, s: ("get", f"/comments/discussion/{s.discussion_id}", {
+        "params": {"with_authors": True}})),
+    "thread tree": (2, lambda c, s: ("get", f"/comments/discussion/{s.discussion_id}/tree", {})),
+    "thread not modified": (1, lambda c, s: ("get", f"/comments/discussion/{s.discussion_id}", {
+        "headers": {"If-None-Match": c.get(f"/comments/discussion/{s.discussion_id}").headers["ETag"]}})),
+    "edit comment": (4, lambda c, s: ("patch", f"/comments/{s.comment_id}", {
+        "params": {"author_id": s.user_id}, "json": {"body": f"edited {c.counter()}"}})),
+    "delete comment": (5, lambda c, s: ("delete", "/comments/{}".format(c.post(
+        f"/comments/discussion/{s.discussion_id}", params={"author_id": s.user_id}, json={"body": "doomed"},
+    ).json()["id"]), {"params": {"author_id": s.user_id}})),
+    "edit discussion": (4, lambda c, s: ("patch", f"/discussions/{s.discussion_id}", {
+        "params": {"author_id": s.user_id}, "json": {"title": f"edited {c.counter()}"}})),
+    "user discussions": (1, lambda c, s: ("get", f"/users/{s.user_id}/discussions", {})),
+    "user comments": (1, lambda c, s: ("get", f"/users/{s.user_id}/comments", {})),
+    "changes": (3, lambda c, s: ("get", "/changes/", {})),
+    "export": (3, lambda c, s: ("get", "/export", {})),
+    "search": (1, lambda c, s: ("get", "/search/", {"params": {"q": "budget"}})),
+    "export discussion": (2, lambda c, s: ("get", f"/discussions/{s.discussion_id}/export", {})),
+}
+
+
+def _grow(db, user_id, discussion_id, parent_id, comments):
+    bulk.import_discussions(db, [
+        schemas.DiscussionImport(title=f"budget {i}", body="filler", author_id=user_id)
+        for i in range(comments)
+    ], chunk_size=500)
+    bulk.import_comments(db, [
+        schemas.CommentImport(
+            body=f"budget reply {i}",
+            author_id=user_id,
+            discussion_id=discussion_id,
+            parent_id=parent_id if i % 2 else None,
+        )
+        for i in range(comments)
+    ], chunk_size=500)
+
+
+def _measure(client, query_counter, seed, request):
+    method, url, kwargs = request(client, seed)
+    query_counter.reset()
+    res = getattr(client, method)(url, **kwargs)
+    assert res.status_code < 400, res.text
+    if url.endswith("/export"):
+        res.read()
+    return query_counter.count
+
+
+@pytest.mark.parametrize("name", sorted(BUDGETS))
+def test_query_budget(name, client, db_session, query_counter, monkeypatch):
+    monkeypatch.setattr(config, "RESPONSE_CACHE", False)
+    budget, request = BUDGETS[name]
+    calls = iter(range(1_000_000))
+    client.counter = lambda: next(calls)
+
+    user = models.User(username="budget_owner")
+    db_session.add(user)
+    db_session.commit()
+    # The session is closed after every request, so keep plain ids only.
+    user_id = user.id
+    discussion_id = bulk.import_discussions(db_session, [
+        schemas.DiscussionImport(title="budget thread", body="seed", author_id=user_id)
+    ], chunk_size=1)["ids"][0]
+    comment_id = bulk.import_comments(db_session, [
+        schemas.CommentImport(body="budget root", author_id=user_id, discussion_id=discussion_id)
+    ], chunk_size=1)["ids"][0]
+    seed = Seed(user_id, discussion_id, comment_id)
+
+    _grow(db_session, user_id, discussion_id, comment_id, N)
+    small = _measure(client, query_counter, seed, request)
+    _grow(db_session, user_id, discussion_id, comment_id, 9 * N)
+    large = _measure(client, query_counter, seed, request)
+
+    assert small <= budget, f"{name}: {small} statements, budget is {budget}"
+    assert large == small, f"{name}: {small} statements with N rows but {large} with 10N"
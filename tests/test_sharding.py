@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine, select
+from app import migrate, models, sharding
+from app.sharding import Shards
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    global_engine = create_engine(f"sqlite:///{tmp_path / 'global.db'}")
+    migrate.upgrade(global_engine)
+    with global_engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "ann"}, {"id": 2, "username": "ben"}])
+    shards = Shards(
+        [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(2)], global_engine, global_engine, block_size=3,
+    )
+    monkeypatch.setattr(sharding, "shards", shards)
+    assert sharding.upgrade() == 2
+    yield shards
+    for writer, reader in shards.engines:
+        writer.dispose()
+        reader.dispose()
+    global_engine.dispose()
+
+
+def _rows(shards, index, model):
+    with shards.session(index, readonly=True) as db:
+        return db.scalars(select(model.id).order_by(model.id)).all()
+
+
+def test_discussions_and_comments_live_on_their_shard(client, shards):
+    ids = [
+        client.post("/discussions/", params={"author_id": 1 + i % 2}, json={"title": f"d{i}", "body": "b"}).json()["id"]
+        for i in range(5)
+    ]
+    assert ids == [1, 2, 3, 4, 5]
+    assert _rows(shards, 0, models.Discussion) == [2, 4]
+    assert _rows(shards, 1, models.Discussion) == [1, 3, 5]
+    assert client.post("/discussions/", params={"author_id": 99}, json={"title": "t", "body": "b"}).status_code == 404
+
+    root = client.post("/comments/discussion/2", params={"author_id": 1}, json={"body": "root"}).json()
+    reply = client.post("/comments/discussion/2", params={"author_id": 2}, json={"body": "re", "parent_id": root["id"]}).json()
+    other = client.post("/comments/discussion/3", params={"author_id": 1}, json={"body": "elsewhere"}).json()
+    assert root["id"] % 2 == reply["id"] % 2 == 0
+    assert other["id"] % 2 == 1
+    assert len({root["id"], reply["id"], other["id"]}) == 3
+
+    assert client.patch(f"/comments/{reply['id']}", params={"author_id": 2}, json={"body": "edited"}).status_code == 200
+    assert client.delete(f"/comments/{other['id']}", params={"author_id": 1}).status_code == 200
+    tree = client.get("/comments/discussion/2/tree", params={"with_authors": True}).json()
+    assert tree["items"][0]["replies"][0]["body"] == "edited"
+    assert tree["authors"] == {"1": "ann", "2": "ben"}
+    assert client.get("/comments/discussion/3").json()["items"][0]["deleted"] is True
+
+
+def test_listings_merge_every_shard(client, shards):
+    for i in range(5):
+        client.post("/discussions/", params={"author_id": 1}, json={"title": f"d{i}", "body": "b"})
+    client.post("/comments/discussion/1", params={"author_id": 1}, json={"body": "bump"})
+
+    first = client.get("/discussions/", params={"limit": 3}).json()
+    second = client.get("/discussions/", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    assert [d["title"] for d in first["items"] + second["items"]] == ["d4", "d3", "d2", "d1", "d0"]
+    assert second["next_cursor"] is None
+    assert client.get("/discussions/", params={"sort": "active", "limit": 1}).json()["items"][0]["title"] == "d0"
+
+    feed = client.get("/users/1/discussions", params={"limit": 4}).json()
+    assert [d["title"] for d in feed["items"]] == ["d4", "d3", "d2", "d1"]
+    assert feed["next_cursor"] is not None
+
+
+def test_global_features_unavailable(client, shards):
+    assert client.get("/search/", params={"q": "x"}).status_code == 501
+    assert client.get("/changes/").status_code == 501
+    assert client.get("/export").status_code == 501
+    assert client.post("/comments/bulk", json=[]).status_code == 501
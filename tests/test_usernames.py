@@ -0,0 +1,23 @@
+from app import models, usernames
+
+
+def test_lookup_loads_misses_in_one_query(db_session, query_counter):
+    users = [models.User(username=f"cached{i}") for i in range(3)]
+    db_session.add_all(users)
+    db_session.commit()
+    ids = [user.id for user in users]
+
+    query_counter.reset()
+    assert usernames.lookup(db_session, ids + [99999]) == {id: f"cached{i}" for i, id in enumerate(ids)}
+    assert query_counter.count == 1
+
+    query_counter.reset()
+    assert usernames.exists(db_session, ids[0])
+    assert usernames.lookup(db_session, ids[1:]) == {ids[1]: "cached1", ids[2]: "cached2"}
+    assert query_counter.count == 0
+
+    # Unknown ids are not cached: a user created later is found
+    assert not usernames.exists(db_session, 99999)
+    db_session.add(models.User(id=99999, username="late"))
+    db_session.commit()
+    assert usernames.exists(db_session, 99999)